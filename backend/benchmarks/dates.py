@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import ephem
+from dateutil import parser
+
+from helpers import Dates
+
+
+def parse_date(date: str) -> float or None:
+    # the conversion every seat went through before Dates
+    try:
+        return ephem.julian_date(parser.parse(date))
+    except Exception:
+        return None
+
+
+def build_seat_map(seats: int, timeslots: int) -> tuple[str, list[dict], list[dict]]:
+    available_date = "2024-03-01"
+    slots = [dict(time=f"{10 + i % 12:02d}:{i // 12 % 2 * 30:02d}:00") for i in range(timeslots)]
+    seat_map = [dict(row=i // 50 + 1, column=i % 50 + 1, timeslot=i % timeslots) for i in range(seats)]
+    return available_date, slots, seat_map
+
+
+def measure_current(available_date: str, slots: list[dict], seat_map: list[dict]) -> tuple[float, list]:
+    start = time.perf_counter()
+    dates = [parse_date(f"{available_date} {slots[seat['timeslot']]['time']}") for seat in seat_map]
+    return time.perf_counter() - start, dates
+
+
+def measure_memoized(available_date: str, slots: list[dict], seat_map: list[dict]) -> tuple[float, list]:
+    Dates.to_julian.cache_clear()
+    start = time.perf_counter()
+    dates = [Dates.to_julian(f"{available_date} {slots[seat['timeslot']]['time']}") for seat in seat_map]
+    return time.perf_counter() - start, dates
+
+
+def measure_batch(available_date: str, slots: list[dict], seat_map: list[dict]) -> tuple[float, list]:
+    Dates.to_julian.cache_clear()
+    start = time.perf_counter()
+    slot_dates = Dates.to_julian_many([f"{available_date} {slot['time']}" for slot in slots])
+    dates = [slot_dates[seat["timeslot"]] for seat in seat_map]
+    return time.perf_counter() - start, dates
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Compare seat date conversion with dateutil and with Dates")
+    arguments.add_argument("--seats", type=int, default=10000)
+    arguments.add_argument("--timeslots", type=int, default=4)
+    arguments.add_argument("--repeat", type=int, default=5)
+    args = arguments.parse_args()
+
+    available_date, slots, seat_map = build_seat_map(seats=args.seats, timeslots=args.timeslots)
+
+    print(f"Seats: {args.seats}, timeslots: {args.timeslots}, repeat: {args.repeat}")
+    baseline = None
+    for name, measure in [("dateutil", measure_current), ("memoized", measure_memoized), ("batch", measure_batch)]:
+        elapsed, results = 0, list()
+        for _ in range(args.repeat):
+            seconds, results = measure(available_date=available_date, slots=slots, seat_map=seat_map)
+            elapsed += seconds
+
+        if baseline is None:
+            baseline = elapsed, results
+        total = args.seats * args.repeat
+        print(
+            f"{name}: {elapsed:.3f} seconds, {total / elapsed:.0f} seats/sec, "
+            f"speedup {baseline[0] / elapsed:.1f}x, mismatches {sum(1 for a, b in zip(baseline[1], results) if a != b)}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+import aiosqlite
+
+from helpers import Database, Migrations
+
+# queries that read a whole table on purpose, with the reason
+SCANS = {
+    ("get_cities", "cities"): "returns every city",
+}
+
+
+async def migrate(path: str):
+    async with aiosqlite.connect(path) as connection:
+        await Migrations.migrate(connection=connection)
+
+
+def get_parameters(query: str) -> tuple | dict:
+    # the plan does not depend on the values, every parameter is bound to null
+    names = set(re.findall(r":(\w+)", query))
+    return dict.fromkeys(names) if names else (None,) * query.count("?")
+
+
+def get_scans(plan: list) -> list[str]:
+    # a row of the plan reads "SCAN <table>" for a full table scan and "SCAN <table> USING ... INDEX" for an index,
+    # rows a subquery already produced are scanned as well, those are not tables
+    details = [detail for _, _, _, detail in plan]
+    subqueries = {detail.split()[1] for detail in details if detail.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+    return [
+        detail.split()[1] for detail in details
+        if detail.startswith("SCAN ") and "INDEX" not in detail and detail.split()[1] not in subqueries
+    ]
+
+
+def check(path: str, verbose: bool) -> list[str]:
+    failures = list()
+    with sqlite3.connect(path) as connection:
+        for name, query in Database.QUERIES.items():
+            plan = connection.execute(f"EXPLAIN QUERY PLAN {query}", get_parameters(query=query)).fetchall()
+            if verbose:
+                print(name)
+                for _, _, _, detail in plan:
+                    print(f"    {detail}")
+
+            for table in get_scans(plan=plan):
+                if (name, table) not in SCANS:
+                    failures.append(f"{name} scans the whole of {table}")
+    return failures
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Check that no hot query of the backend scans a whole table")
+    arguments.add_argument("--db", help="database to check, a new one is migrated when not given")
+    arguments.add_argument("--verbose", action="store_true", help="print the plan of every query")
+    args = arguments.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.db or os.path.join(directory, "plans.db")
+        asyncio.run(migrate(path=path))
+        failures = check(path=path, verbose=args.verbose)
+
+    for failure in failures:
+        print(failure)
+    print(f"{len(Database.QUERIES)} queries checked, {len(failures)} full table scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,7 @@
-from helpers.database import Database
\ No newline at end of file
+from helpers.database import Database
+from helpers.pool import ConnectionPool
+from helpers.statements import Statements
+from helpers.dates import Dates
+from helpers.recorder import Recorder
+from helpers.profiler import Profiler
+from helpers.migrations import Migrations
@@ -1,12 +1,164 @@
-import aiosqlite
+import re
+
+from helpers.migrations import Migrations
+from helpers.pool import ConnectionPool
+from helpers.statements import Statements
 
 
 class Database:
+    # the julian day number of today and of a date, to compare with the day columns of events
+    TODAY = "CAST(julianday() + 0.5 AS INTEGER)"
+    DAY = "CAST(julianday(:date) + 0.5 AS INTEGER)"
+    # events that have not started yet, a filter that is not given matches every event
+    ALL_EVENTS_FILTER = f"""
+        WHERE start_day >= {TODAY}
+        AND (:date IS NULL OR (start_day >= {DAY} AND end_day <= {DAY}))
+        AND (:city_id IS NULL OR city_id = :city_id)
+        AND (:category_id IS NULL OR category_id = :category_id)
+    """
+    EVENTS_LIST_COLUMNS = """
+        e.id,
+        e.title,
+        e.photo,
+        e.short_description,
+        datetime(e.start),
+        datetime(e.end),
+        e.url,
+        ct.id,
+        ct.name,
+        ci.id,
+        ci.name
+    """
+    # every query is fixed text with bound values, so a pooled connection prepares each of them once
+    QUERIES = dict(
+        get_event="""
+            SELECT
+                e.id,
+                title,
+                photo,
+                description,
+                phone,
+                link,
+                datetime(start),
+                datetime(end),
+                url,
+                l.id,
+                l.name,
+                ct.id,
+                ct.name,
+                ci.id,
+                ci.name,
+                short_description,
+                ticket_url
+            FROM events e
+            INNER JOIN locations l ON location_id = l.id
+            INNER JOIN categories ct ON category_id = ct.id
+            INNER JOIN cities ci ON city_id = ci.id
+            WHERE e.id = ?
+        """,
+        get_event_ticket_url="""
+            SELECT
+                ticket_url
+            FROM events e
+            WHERE e.id = ?
+        """,
+        all_events=f"""
+            SELECT {EVENTS_LIST_COLUMNS}
+            FROM events e
+            INNER JOIN locations l ON location_id = l.id
+            INNER JOIN categories ct ON category_id = ct.id
+            INNER JOIN cities ci ON city_id = ci.id
+            {ALL_EVENTS_FILTER}
+            LIMIT :limit
+            OFFSET :offset
+        """,
+        count_all_events=f"""
+            SELECT
+                count(*)
+            FROM events e
+            {ALL_EVENTS_FILTER}
+        """,
+        get_event_sectors="""
+            SELECT DISTINCT sector FROM events_prices e
+            WHERE e.event_id = ? AND date(e.date) = date(?)
+            ORDER BY price
+        """,
+        get_event_prices="""
+            SELECT
+                e.id,
+                datetime(date),
+                price,
+                row,
+                column,
+                available,
+                sector
+            FROM events_prices e
+            WHERE e.event_id = :id AND date(e.date) = date(:date) AND (:sector IS NULL OR sector = :sector)
+            ORDER BY row, column
+        """,
+        get_cities="SELECT id, name FROM cities",
+        get_categories="""
+            SELECT DISTINCT category_id, c.name, count(*) priority FROM events
+            INNER JOIN categories c on c.id = category_id
+            GROUP BY category_id
+            ORDER BY priority DESC
+        """,
+        get_dates=f"""
+            WITH days AS (
+                SELECT start_day AS day FROM events WHERE start_day >= {TODAY}
+                UNION
+                SELECT end_day AS day FROM events WHERE end_day >= {TODAY}
+            )
+            SELECT date(day) FROM days ORDER BY day
+        """,
+        search_event=f"""
+            SELECT {EVENTS_LIST_COLUMNS}
+            FROM events_search
+            INNER JOIN events e ON e.rowid = events_search.rowid
+            INNER JOIN locations l ON location_id = l.id
+            INNER JOIN categories ct ON category_id = ct.id
+            INNER JOIN cities ci ON city_id = ci.id
+            WHERE events_search MATCH :query
+            ORDER BY events_search.rank
+            LIMIT :limit
+            OFFSET :offset
+        """,
+        get_search_event_count="""
+            SELECT count(*) FROM events_search WHERE events_search MATCH ?
+        """
+    )
+
     def __init__(self, config: dict):
         self._config = config
+        self._statements = Statements(queries=self.QUERIES)
+        self._pool = ConnectionPool(
+            path=config['connection']['sqlite'],
+            readers=config['connection']['readers'],
+            timeout=config['connection']['timeout'],
+            pragmas=config['connection']['pragmas'],
+            # the writer has its own insert statements on top of the registry
+            statements=len(self._statements) + config['connection']['statements']
+        )
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return self._pool
+
+    @property
+    def statements(self) -> Statements:
+        return self._statements
+
+    async def connect(self) -> list[int]:
+        await self._pool.open()
+        async with self._pool.writer() as connection:
+            return await Migrations.migrate(connection=connection)
+
+    async def disconnect(self):
+        await self._pool.close()
+        self._statements.clear()
 
     async def insert(self, table: str, columns: list, data: list, on_conflict="ON CONFLICT DO NOTHING"):
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+        async with self._pool.writer() as connection:
             column_names = ", ".join(columns)
             placeholders = ", ".join(["?"] * len(columns))
 
@@ -14,216 +166,75 @@ class Database:
             await connection.executemany(query, data)
             await connection.commit()
 
-    async def get_event(self, id) -> list:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f"""
-                SELECT
-                    e.id,
-                    title,
-                    photo,
-                    description,
-                    phone,
-                    link,
-                    datetime(start),
-                    datetime(end),
-                    url,
-                    l.id,
-                    l.name,
-                    ct.id,
-                    ct.name,
-                    ci.id,
-                    ci.name,
-                    short_description,
-                    ticket_url
-                FROM events e
-                INNER JOIN locations l ON location_id = l.id
-                INNER JOIN categories ct ON category_id = ct.id
-                INNER JOIN cities ci ON city_id = ci.id
-                WHERE e.id = '{id}'
-            """
+    async def fetch(self, name: str, parameters: tuple | dict = ()) -> list:
+        async with self._pool.reader() as connection:
+            return await self._statements.fetch(connection=connection, name=name, parameters=parameters)
 
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+    async def get_event(self, id) -> list:
+        rows = await self.fetch(name="get_event", parameters=(id,))
         return rows[0] if len(rows) > 0 else None
 
     async def get_event_ticket_url(self, id) -> str:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f"""
-                SELECT
-                    ticket_url
-                FROM events e
-                WHERE e.id = '{id}'
-            """
-
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+        rows = await self.fetch(name="get_event_ticket_url", parameters=(id,))
         return rows[0][0]
 
     async def all_events(self, offset, limit, date, city_id, category_id) -> list:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            condition = self.get_all_events_filter(date, city_id, category_id)
-
-            query = f"""
-                SELECT
-                    e.id,
-                    title,
-                    photo,
-                    short_description,
-                    datetime(start),
-                    datetime(end),
-                    url,
-                    ct.id,
-                    ct.name,
-                    ci.id,
-                    ci.name
-                FROM events e
-                INNER JOIN locations l ON location_id = l.id
-                INNER JOIN categories ct ON category_id = ct.id
-                INNER JOIN cities ci ON city_id = ci.id
-               {condition}
-                LIMIT {limit}
-                OFFSET {offset}
-            """
-
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
-        return rows
+        parameters = self.get_all_events_filter(date, city_id, category_id)
+        return await self.fetch(name="all_events", parameters=dict(parameters, limit=limit, offset=offset))
 
     async def get_event_sectors(self, id, date) -> list:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f"""
-                SELECT DISTINCT sector FROM events_prices e
-                WHERE e.event_id = '{id}' AND date(e.date) = date('{date}')
-                ORDER BY price 
-            """
-
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
-        return rows
+        return await self.fetch(name="get_event_sectors", parameters=(id, date))
 
     async def get_event_prices(self, id, date, sector: str = None) -> list:
-        condition = f"WHERE e.event_id = '{id}' AND date(e.date) = date('{date}')"
-        condition = condition if not sector else f"{condition} AND sector = '{sector}'"
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f"""
-                SELECT
-                    e.id,
-                    datetime(date),
-                    price,
-                    row,
-                    column,
-                    available,
-                    sector
-                FROM events_prices e
-                {condition}
-                ORDER BY row, column
-            """
-
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
-        return rows
+        return await self.fetch(name="get_event_prices", parameters=dict(id=id, date=date, sector=sector or None))
 
     async def count_all_events(self, date, city_id, category_id) -> int:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            condition = self.get_all_events_filter(date, city_id, category_id)
-            query = f"""
-                SELECT
-                    count(*)
-                FROM events e
-                {condition}
-            """
-
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+        parameters = self.get_all_events_filter(date, city_id, category_id)
+        rows = await self.fetch(name="count_all_events", parameters=parameters)
         return int(rows[0][0])
 
     @staticmethod
-    def get_all_events_filter(date, city_id, category_id):
-        date_query = f"date(start) >= date() AND (date(start) >= date('{date}') AND date(end) <= date('{date}'))" if date else ""
-        city_query = f"city_id = '{city_id}'" if city_id else ""
-        category_query = f"category_id = '{category_id}'" if category_id else ""
-
-        condition = "WHERE date(start) >= date()"
-        if date_query:
-            condition += f" AND {date_query}"
-
-        if city_query:
-            condition += f"AND {city_query}"
-
-        if category_query:
-            condition += f"AND {category_query}"
-
-        return condition
+    def get_all_events_filter(date, city_id, category_id) -> dict:
+        # an empty query parameter does not filter, as a missing one
+        return dict(date=date or None, city_id=city_id or None, category_id=category_id or None)
 
     async def get_cities(self):
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = "SELECT id, name FROM cities"
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+        rows = await self.fetch(name="get_cities")
         return [{"id": row[0], "name": row[1]} for row in rows]
 
     async def get_categories(self):
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = '''
-                SELECT DISTINCT category_id, c.name, count(*) priority FROM events
-                INNER JOIN categories c on c.id = category_id            
-                GROUP BY category_id
-                ORDER BY priority DESC;
-            '''
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+        rows = await self.fetch(name="get_categories")
         return [{"id": row[0], "name": row[1]} for row in rows]
 
     async def get_dates(self):
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = """
-                WITH dates AS (
-                    SELECT start as date FROM events WHERE start IS NOT null
-                    UNION ALL
-                    SELECT end as date FROM events WHERE end IS NOT null
-                )
-                SELECT DISTINCT date(date) FROM dates WHERE date(date) >= date() ORDER BY date
-            """
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+        rows = await self.fetch(name="get_dates")
         return [row[0] for row in rows]
 
     async def search_event(self, query: str, offset: int, limit: int) -> list:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f'''
-                SELECT
-                    e.id,
-                    title,
-                    photo,
-                    short_description,
-                    datetime(start),
-                    datetime(end),
-                    url,
-                    ct.id,
-                    ct.name,
-                    ci.id,
-                    ci.name
-                FROM events e
-                INNER JOIN locations l ON location_id = l.id
-                INNER JOIN categories ct ON category_id = ct.id
-                INNER JOIN cities ci ON city_id = ci.id
-                WHERE e.title LIKE '%{query}%'
-                LIMIT {limit}
-                OFFSET {offset}
-            '''
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
-        return rows
+        match = self.get_search_match(query=query)
+        if match is None:
+            return list()
+        return await self.fetch(name="search_event", parameters=dict(query=match, limit=limit, offset=offset))
 
     async def get_search_event_count(self, query: str) -> int:
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f'''SELECT count(*) FROM events e WHERE e.title LIKE '%{query}%';'''
-            cursor = await connection.execute(query)
-            rows = await cursor.fetchall()
+        match = self.get_search_match(query=query)
+        if match is None:
+            return 0
+        rows = await self.fetch(name="get_search_event_count", parameters=(match,))
         return int(rows[0][0])
 
+    @staticmethod
+    def get_search_match(query: str | None) -> str | None:
+        # every word of the query quoted, so the text of a user is never read as fts5 syntax, and matched as a prefix,
+        # a single letter would be the prefix of a large part of the index, it only matches itself, ё is indexed as е
+        words = re.findall(r"\w+", (query or "").replace("ё", "е").replace("Ё", "Е"))
+        if len(words) == 0:
+            return None
+        return " ".join(f'"{word}"*' if len(word) > 1 else f'"{word}"' for word in words)
+
     async def get_as_dict(self, key: str, value: str, table: str):
-        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+        # names of columns and tables cannot be bound, they come from the code only
+        async with self._pool.reader() as connection:
             query = f"SELECT {key}, {value} FROM main.{table}"
             cursor = await connection.execute(query)
             data = await cursor.fetchall()
@@ -0,0 +1,61 @@
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+import ephem
+from dateutil import parser
+
+
+class Dates:
+    # the formats sxodim returns, "2024-03-01" or "2024-03-01 19:00[:00[.000]]" with an optional "T" and a utc
+    # offset after the time
+    ISO = re.compile(
+        r"(\d{4})-(\d{2})-(\d{2})"
+        r"(?:[ T](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?(Z|[+-]\d{2}:?\d{2})?)?"
+    )
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def to_julian(date: str) -> float or None:
+        try:
+            parsed_date = Dates.parse_iso(date=date)
+            if parsed_date is None:
+                parsed_date = parser.parse(date)
+            return ephem.julian_date(parsed_date)
+        except Exception:
+            return None
+
+    @staticmethod
+    def to_julian_many(dates: list[str]) -> list[float or None]:
+        converted = {date: Dates.to_julian(date) for date in set(dates)}
+        return [converted[date] for date in dates]
+
+    @staticmethod
+    def parse_iso(date: str) -> datetime or None:
+        match = Dates.ISO.fullmatch(date)
+        if match is None:
+            return None
+
+        year, month, day, hour, minute, second, fraction, offset = match.groups()
+        tzinfo = None
+        if offset == "Z":
+            tzinfo = timezone.utc
+        elif offset is not None:
+            digits = offset[1:].replace(":", "")
+            delta = timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+            tzinfo = timezone(-delta if offset[0] == "-" else delta)
+
+        try:
+            return datetime(
+                year=int(year),
+                month=int(month),
+                day=int(day),
+                hour=int(hour or 0),
+                minute=int(minute or 0),
+                second=int(second or 0),
+                microsecond=int((fraction or "0").ljust(6, "0")),
+                tzinfo=tzinfo
+            )
+        except ValueError:
+            # out of range values are left to dateutil, which decides what they mean
+            return None
@@ -0,0 +1,70 @@
+import asyncio
+import contextlib
+
+import aiosqlite
+
+
+class ConnectionPool:
+    def __init__(self, path: str, readers: int, timeout: float, pragmas: dict, statements: int):
+        self._path = path
+        self._readers = readers
+        self._timeout = timeout
+        self._pragmas = pragmas
+        self._statements = statements
+        self._idle = asyncio.Queue()
+        self._connections = list()
+        self._writer = None
+        self._lock = asyncio.Lock()
+        self.Stats = dict(reads=0, writes=0, waits=0)
+
+    async def open(self):
+        # the writer goes first, so wal is on before any reader looks at the file
+        self._writer = await self.connect()
+        await self._writer.execute("PRAGMA journal_mode=WAL")
+        await self._writer.execute("PRAGMA synchronous=NORMAL")
+
+        for _ in range(self._readers):
+            connection = await self.connect()
+            # a reader never takes the write lock, so it never queues behind the writer
+            await connection.execute("PRAGMA query_only=ON")
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._connections:
+            await connection.close()
+        self._connections = list()
+        self._idle = asyncio.Queue()
+
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self._path, timeout=self._timeout, cached_statements=self._statements)
+        for name, value in self._pragmas.items():
+            await connection.execute(f"PRAGMA {name}={value}")
+        return connection
+
+    @contextlib.asynccontextmanager
+    async def reader(self):
+        self.Stats["reads"] += 1
+        if self._idle.empty():
+            self.Stats["waits"] += 1
+
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    @contextlib.asynccontextmanager
+    async def writer(self):
+        # sqlite takes one writer at a time anyway, the lock keeps transactions of concurrent requests apart
+        async with self._lock:
+            self.Stats["writes"] += 1
+            try:
+                yield self._writer
+            except Exception:
+                await self._writer.rollback()
+                raise
@@ -0,0 +1,96 @@
+import contextlib
+import cProfile
+import marshal
+import os
+import time
+import tracemalloc
+
+
+class Profiler:
+    def __init__(self, directory: str, top: int, frames: int):
+        self._directory = directory
+        self._top = top
+        self._frames = frames
+        self._profile = None
+        self._started = None
+        self._tracing = False
+        self._count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self) -> bool:
+        # the profiler and tracemalloc are process wide, nothing else is profiled until the running profile ends
+        if self._profile is not None:
+            return False
+
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start(self._frames)
+
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return True
+
+    def stop(self, name: str) -> str:
+        return self.save(**self.collect(name=name))
+
+    def collect(self, name: str, note: str = None) -> dict:
+        # runs on the profiled thread, save only writes the files and may run on another one
+        self._profile.disable()
+        self._profile.create_stats()
+        elapsed = time.perf_counter() - self._started
+
+        self._count += 1
+        path = os.path.join(self._directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._count}")
+        stats = self._profile.stats
+        self._profile = None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        if self._tracing:
+            tracemalloc.stop()
+
+        return dict(
+            path=path,
+            name=name,
+            note=note,
+            elapsed=elapsed,
+            stats=stats,
+            snapshot=snapshot,
+            current=current,
+            peak=peak
+        )
+
+    def save(self, path: str, name: str, note: str | None, elapsed: float, stats: dict,
+             snapshot: tracemalloc.Snapshot, current: int, peak: int) -> str:
+        os.makedirs(self._directory, exist_ok=True)
+        # the format of cProfile.Profile.dump_stats, pstats and snakeviz load it
+        with open(f"{path}.pstats", 'wb') as file:
+            marshal.dump(stats, file)
+
+        with open(f"{path}.allocations.txt", 'w', encoding='utf-8') as file:
+            file.write(f"{name}: {elapsed:.3f} seconds, traced memory {current / 1024 ** 2:.1f} MB, "
+                       f"peak {peak / 1024 ** 2:.1f} MB\n")
+            if note:
+                file.write(f"{note}\n")
+            file.write(f"Top {self._top} allocations still alive at the end, by line:\n")
+            for statistic in snapshot.statistics("lineno")[:self._top]:
+                file.write(f"{statistic}\n")
+        return path
+
+    @contextlib.contextmanager
+    def profile(self, name: str):
+        started = self.start()
+        try:
+            yield
+        finally:
+            if started:
+                self.stop(name=name)
@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+from yarl import URL
+
+
+class Recorder:
+    INDEX = "index.jsonl"
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        self._index = dict()
+
+    def load(self):
+        os.makedirs(self._directory, exist_ok=True)
+        index_path = os.path.join(self._directory, self.INDEX)
+        if not os.path.exists(index_path):
+            return
+
+        with open(index_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._index[entry["key"]] = entry
+
+    @staticmethod
+    def get_key(method: str, url, data: bytes = None) -> str:
+        url = URL(str(url))
+        key = f"{method.upper()} {url.host}{url.raw_path_qs}"
+        if data:
+            key += f" {hashlib.sha1(data).hexdigest()}"
+        return key
+
+    @staticmethod
+    def rewrite(url, replay: str) -> str:
+        # every host is served by the replay server under its own first path segment
+        url = URL(str(url))
+        return f"{replay.rstrip('/')}/{url.host}{url.raw_path_qs}"
+
+    def get(self, key: str) -> dict | None:
+        return self._index.get(key)
+
+    def get_path(self, entry: dict) -> str:
+        return os.path.join(self._directory, entry["body"])
+
+    async def record(self, method: str, url, status: int, content_type: str | None, content: bytes,
+                     data: bytes = None):
+        entry = dict(
+            key=self.get_key(method=method, url=url, data=data),
+            url=str(url),
+            status=status,
+            content_type=content_type,
+            # bodies are stored by content, so the same photo behind many urls is kept once
+            body=hashlib.sha256(content).hexdigest()
+        )
+        self._index[entry["key"]] = entry
+        # every response is recorded, the files are written off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.write, entry, content)
+
+    def write(self, entry: dict, content: bytes):
+        file_path = self.get_path(entry=entry)
+        if not os.path.exists(file_path):
+            # a unique temporary file, threads of one process may write the same body at once
+            temporary = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, 'wb') as file:
+                file.write(content)
+            os.replace(temporary, file_path)
+
+        # the index is only appended to, the last line of a key wins, so several processes can record at once
+        with open(os.path.join(self._directory, self.INDEX), 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + "\n")
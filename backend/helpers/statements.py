@@ -0,0 +1,37 @@
+import aiosqlite
+
+
+class Statements:
+    def __init__(self, queries: dict):
+        self._queries = queries
+        self._ran = dict()
+        # runs of a query on a connection that had not run it yet and on one that had, these count runs and not
+        # lookups in the statement cache of sqlite3, which the pool sizes to hold every query
+        self.Stats = {name: dict(first_runs=0, repeat_runs=0) for name in queries}
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    async def fetch(self, connection: aiosqlite.Connection, name: str, parameters: tuple | dict = ()) -> list:
+        # the text of a query never changes, so it is parsed and planned on the first run on every connection only
+        ran = self._ran.setdefault(id(connection), set())
+        if name in ran:
+            self.Stats[name]["repeat_runs"] += 1
+        else:
+            self.Stats[name]["first_runs"] += 1
+            ran.add(name)
+
+        cursor = await connection.execute(self._queries[name], parameters)
+        return await cursor.fetchall()
+
+    def clear(self):
+        self._ran = dict()
+
+    def summary(self) -> dict:
+        return dict(
+            first_runs=sum(stats["first_runs"] for stats in self.Stats.values()),
+            repeat_runs=sum(stats["repeat_runs"] for stats in self.Stats.values()),
+            statements={
+                name: stats for name, stats in self.Stats.items() if stats["first_runs"] + stats["repeat_runs"] > 0
+            }
+        )
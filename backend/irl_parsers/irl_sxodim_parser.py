@@ -1,13 +1,13 @@
+import json
 import uuid
 from datetime import datetime
 from logging import Logger
 
 import aiohttp
-import ephem
 from bs4 import BeautifulSoup
-from dateutil import parser
+from yarl import URL
 
-from helpers import Database
+from helpers import Database, Dates, Recorder
 from models import EventPrice, Event
 from models.table_configurations import TableConfiguration
 
@@ -21,14 +21,14 @@ class IrlSxodimParser:
         self._db = db
         self._session = aiohttp.ClientSession(trust_env=True)
         self._tables = TableConfiguration()
+        self._recorder = Recorder(directory=config["fixtures"]["record"]) if config["fixtures"]["record"] else None
+        self._replay = config["fixtures"]["replay"]
+        if self._recorder is not None:
+            self._recorder.load()
 
     @staticmethod
     def parse_date(date: str) -> int or None:
-        try:
-            parsed_date = parser.parse(date)
-            return ephem.julian_date(parsed_date)
-        except Exception:
-            return None
+        return Dates.to_julian(date)
 
     async def parse_available_dates(self, ticket_url: str):
         page = await self.get_event_ticket_page(url=ticket_url)
@@ -55,7 +55,9 @@ class IrlSxodimParser:
         date = datetime.strptime(available_date, "%Y-%m-%d").strftime("%d.%m.%Y")
         timeslots = await self.get_ticket_timeslots(url=ticket_url, date=available_date)
         if len(timeslots) > 0:
-            for timeslot in timeslots:
+            # every seat of a timeslot shares its date, so it is converted once per timeslot
+            timeslot_dates = Dates.to_julian_many([f"{available_date} {timeslot['time']}" for timeslot in timeslots])
+            for timeslot, timeslot_date in zip(timeslots, timeslot_dates):
                 rates = await self.get_event_timeslot_rates(url=ticket_url, date=date, time=timeslot["time_short"])
                 hall = await self.get_event_timeslot_hall(url=ticket_url, date=date, time=timeslot["time_short"])
 
@@ -64,7 +66,7 @@ class IrlSxodimParser:
                         price = EventPrice(
                             id=str(uuid.uuid4()),
                             event_id=event.id,
-                            date=self.parse_date(f"{available_date} {timeslot['time']}"),
+                            date=timeslot_date,
                             price=rate["price"],
                             row=0,
                             column=0,
@@ -78,7 +80,7 @@ class IrlSxodimParser:
                         price = EventPrice(
                             id=str(uuid.uuid4()),
                             event_id=event.id,
-                            date=self.parse_date(f"{available_date} {timeslot['time']}"),
+                            date=timeslot_date,
                             price=seat["seatPrice"]["rate"]["price"] if seat["seatPrice"] else None,
                             sector=f"{seat['sector_name']}",
                             row=seat['row'],
@@ -104,26 +106,23 @@ class IrlSxodimParser:
         await self._db.insert(
             table=self._tables.EVENTS_PRICES.NAME,
             columns=self._tables.EVENTS_PRICES.COLUMNS,
-            data=[
-                [item.__dict__.get(col) for col in self._tables.EVENTS_PRICES.COLUMNS]
-                for item in upload
-            ],
+            data=[self._tables.EVENTS_PRICES.ROW(item) for item in upload],
             on_conflict=self._tables.EVENTS_PRICES.ON_CONFLICT
         )
 
     async def get_event_ticket_page(self, url: str) -> BeautifulSoup:
-        async with self._session.get(url=url) as response:
-            content = await response.read()
+        _, content = await self.request(method="GET", url=url)
         return BeautifulSoup(content, "lxml")
 
     async def get_event_ticket(self, url: str) -> dict:
-        async with self._session.get(url=url) as response:
-            return await response.json()
+        _, content = await self.request(method="GET", url=url)
+        return json.loads(content)
 
     async def get_ticket_timeslots(self, url: str, date: str) -> list[dict]:
         try:
-            async with self._session.post(url=f"{url}/timeslots", json={"date": f"{date}T00:00:00.000Z"}) as response:
-                timeslots = await response.json()
+            data = {"date": f"{date}T00:00:00.000Z"}
+            _, content = await self.request(method="POST", url=f"{url}/timeslots", data=data)
+            timeslots = json.loads(content)
             return timeslots["data"]
         except:
             return list()
@@ -136,8 +135,8 @@ class IrlSxodimParser:
         if not time:
             params.__delitem__("time")
 
-        async with self._session.get(url=timeslot_url, params=params) as response:
-            rates = await response.json()
+        _, content = await self.request(method="GET", url=timeslot_url, params=params)
+        rates = json.loads(content)
 
         for rate in rates["data"]:
             result[rate["rate_id"]] = rate
@@ -146,8 +145,26 @@ class IrlSxodimParser:
 
     async def get_event_timeslot_hall(self, url: str, date: str, time: str) -> dict or None:
         params = {"date": date, "time": time}
-        async with self._session.get(url=f"{url}/hall", params=params) as response:
-            if "html" in response.content_type:
-                return None
-            hall = await response.json()
+        content_type, content = await self.request(method="GET", url=f"{url}/hall", params=params)
+        if "html" in content_type:
+            return None
+        hall = json.loads(content)
         return hall["data"]
+
+    async def request(self, method: str, url: str, params: dict = None, data: dict = None) -> tuple[str, bytes]:
+        # urls keep pointing at the original hosts, only the replay server is asked instead
+        request_url = Recorder.rewrite(url=url, replay=self._replay) if self._replay else url
+        async with self._session.request(method=method, url=request_url, params=params, json=data) as response:
+            content_type = response.content_type
+            content = await response.read()
+
+        if self._recorder is not None:
+            await self._recorder.record(
+                method=method,
+                url=URL(url).update_query(params) if params else url,
+                status=response.status,
+                content_type=content_type,
+                content=content,
+                data=json.dumps(data).encode() if data is not None else None
+            )
+        return content_type, content
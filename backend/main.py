@@ -1,6 +1,8 @@
 import asyncio
+import functools
 import json
 import logging.config
+import random
 import sys
 
 import aiohttp_cors
@@ -8,7 +10,7 @@ from aiohttp import web
 from aiohttp_swagger import setup_swagger
 
 from controllers import EventAnalysisController
-from helpers import Database
+from helpers import Database, Profiler
 
 with open("config.json", 'r', encoding='utf-8') as file:
     config = json.load(file)
@@ -24,7 +26,71 @@ event_analysis_controller = EventAnalysisController(
     db=database
 )
 
-app = web.Application()
+profiler = Profiler(
+    directory=config["profiling"]["directory"],
+    top=config["profiling"]["top"],
+    frames=config["profiling"]["frames"]
+) if config["profiling"]["enabled"] else None
+
+
+in_flight = dict(requests=0, overlapped=0)
+
+
+@web.middleware
+async def profile(request, handler):
+    # a share of the requests to the selected routes is profiled, one at a time, requests that match no route are not,
+    # cProfile and tracemalloc see the whole event loop, so a request is only sampled while no other one runs,
+    # those that come in meanwhile still end up in its profile and its report says how many there were
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else None
+    routes = config["profiling"]["routes"]
+    if profiler.running:
+        in_flight["overlapped"] += 1
+    sampled = (
+        route is not None
+        and (not routes or route in routes)
+        and in_flight["requests"] == 0
+        and random.random() < config["profiling"]["rate"]
+        and profiler.start()
+    )
+    if sampled:
+        in_flight["overlapped"] = 0
+
+    in_flight["requests"] += 1
+    try:
+        return await handler(request)
+    finally:
+        in_flight["requests"] -= 1
+        if sampled:
+            report = profiler.collect(
+                name=route.strip("/").replace("/", "_") or "root",
+                note=f"{in_flight['overlapped']} other requests ran meanwhile and are part of this profile"
+            )
+            # the files are written off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, functools.partial(profiler.save, **report))
+
+
+app = web.Application(middlewares=[profile] if profiler is not None else [])
+
+
+async def open_database(app):
+    # connections live as long as the app, a request only borrows one that is already warm
+    migrations = await database.connect()
+    if migrations:
+        logger.info(f"Applied schema migrations {migrations}")
+
+
+async def close_database(app):
+    await database.disconnect()
+    logger.info(
+        f"Database pool: {database.pool.Stats['reads']} reads, {database.pool.Stats['waits']} waited for a reader, "
+        f"{database.pool.Stats['writes']} writes"
+    )
+    logger.info(f"Statements: {json.dumps(database.statements.summary())}")
+
+
+app.on_startup.append(open_database)
+app.on_cleanup.append(close_database)
 
 
 async def get(request):
@@ -1,4 +1,13 @@
-class Event:
+from .Record import Record
+
+
+class Event(Record):
+    __slots__ = (
+        "id", "src_id", "title", "photo", "short_description", "description", "phone", "link", "location_id",
+        "source_id", "city_id", "url", "ticket_url", "category_id"
+    )
+    KEY = ("id",)
+
     def __init__(
             self,
             id=None,
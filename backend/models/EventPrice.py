@@ -1,4 +1,10 @@
-class EventPrice:
+from .Record import Record
+
+
+class EventPrice(Record):
+    __slots__ = ("id", "event_id", "date", "price", "row", "column", "sector", "available")
+    KEY = ("event_id", "date", "price", "row", "column", "sector")
+
     def __init__(self, id, event_id, date, price, row, column, sector, available):
         self.id = id
         self.event_id = event_id
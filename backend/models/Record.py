@@ -0,0 +1,19 @@
+from operator import attrgetter
+
+
+# rows compare and hash by their natural key, so a buffer holds one row per key and the last one put wins
+class Record:
+    __slots__ = ()
+    KEY = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if len(cls.KEY) == 0:
+            raise TypeError(f"{cls.__name__} has no KEY, name the attributes that identify its rows")
+        cls.get_key = attrgetter(*cls.KEY)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.get_key(self) == other.get_key(other)
+
+    def __hash__(self):
+        return hash(self.get_key(self))
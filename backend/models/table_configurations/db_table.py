@@ -1,7 +1,12 @@
+from operator import attrgetter
+
+
 class DbTable:
     def __init__(self, table: str, columns: list, on_conflict: str, primary_key: str = None, unique_column: str = None):
         self.NAME = table
         self.COLUMNS = columns
+        # builds the row of a model in column order in one call
+        self.ROW = attrgetter(*columns)
         self.ON_CONFLICT = on_conflict
         self.PRIMARY_KEY = primary_key
         self.UNIQUE_COLUMN = unique_column
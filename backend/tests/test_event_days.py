@@ -0,0 +1,83 @@
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import aiosqlite
+
+from helpers import Database, Dates, Migrations
+
+# the filter of /all before the day columns, the day columns have to select the same events
+DATE_FILTER = """
+    WHERE date(start) >= date()
+    AND (:date IS NULL OR (date(start) >= date(:date) AND date(end) <= date(:date)))
+    AND (:city_id IS NULL OR city_id = :city_id)
+    AND (:category_id IS NULL OR category_id = :category_id)
+"""
+# a julian date starts at noon, the calendar day starts at midnight utc
+TIMES = ["00:00:00", "00:00:01", "11:59:59", "12:00:00", "23:59:59"]
+
+
+def get_days() -> list[str]:
+    today = datetime.now(timezone.utc).date()
+    return [str(today + timedelta(days=offset)) for offset in range(-1, 3)]
+
+
+async def fill(connection: aiosqlite.Connection) -> int:
+    await Migrations.migrate(connection=connection)
+    await connection.execute("INSERT INTO cities (id, name, slug) VALUES ('c', 'City', 'city')")
+    await connection.execute("INSERT INTO categories (id, name) VALUES ('k', 'Category')")
+    await connection.execute("INSERT INTO locations (id, name) VALUES ('l', 'Location')")
+
+    moments = [f"{day} {time}" for day in get_days() for time in TIMES]
+    events = [(start, end) for start, end in itertools.product(moments, moments + [None]) if end is None or start <= end]
+    await connection.executemany(
+        """
+        INSERT INTO events (id, title, start, end, city_id, category_id, location_id)
+        VALUES (?, ?, ?, ?, 'c', 'k', 'l')
+        """,
+        [
+            (str(i), f"{start} - {end}", Dates.to_julian(start), Dates.to_julian(end) if end else None)
+            for i, (start, end) in enumerate(events)
+        ]
+    )
+    return len(events)
+
+
+async def select(connection: aiosqlite.Connection, query: str, parameters: dict) -> list:
+    cursor = await connection.execute(query, parameters)
+    return sorted(await cursor.fetchall())
+
+
+def test_day_columns_select_the_same_events_as_dates():
+    async def run():
+        async with aiosqlite.connect(":memory:") as connection:
+            total = await fill(connection=connection)
+            all_events = Database.QUERIES["all_events"]
+            count_all_events = Database.QUERIES["count_all_events"]
+            old_count_all_events = count_all_events.replace(Database.ALL_EVENTS_FILTER, DATE_FILTER)
+            old_all_events = all_events.replace(Database.ALL_EVENTS_FILTER, DATE_FILTER)
+            assert old_all_events != all_events
+
+            for date in [None] + get_days() + [f"{day} 23:59:59" for day in get_days()]:
+                parameters = Database.get_all_events_filter(date=date, city_id=None, category_id=None)
+                parameters.update(limit=total, offset=0)
+
+                events = await select(connection=connection, query=all_events, parameters=parameters)
+                assert events == await select(connection=connection, query=old_all_events, parameters=parameters)
+                assert await select(connection=connection, query=count_all_events, parameters=parameters) == \
+                    await select(connection=connection, query=old_count_all_events, parameters=parameters)
+
+    asyncio.run(run())
+
+
+def test_day_columns_turn_at_midnight_utc():
+    async def run():
+        async with aiosqlite.connect(":memory:") as connection:
+            await fill(connection=connection)
+            cursor = await connection.execute("SELECT title, date(start_day), date(end_day) FROM events")
+            for title, start_day, end_day in await cursor.fetchall():
+                start, end = title.split(" - ")
+                assert start_day == start[:10]
+                assert end_day == (end[:10] if end != "None" else None)
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+import asyncio
+
+import aiosqlite
+import pytest
+
+from helpers import Database, Migrations
+
+
+@pytest.mark.parametrize("query, match", [
+    ("концерт", '"концерт"*'),
+    ("Ёлка", '"Елка"*'),
+    ("ёжик в тумане", '"ежик"* "в" "тумане"*'),
+    ("Қазақ", '"Қазақ"*'),
+    ('say "hi" \'there\'', '"say"* "hi"* "there"*'),
+    ("NEAR(рок джаз)", '"NEAR"* "рок"* "джаз"*'),
+    ("rock OR jazz", '"rock"* "OR"* "jazz"*'),
+    ("title:jazz -rock ^live*", '"title"* "jazz"* "rock"* "live"*'),
+    ("", None),
+    (None, None),
+    ('"" () * -', None),
+])
+def test_search_match(query, match):
+    assert Database.get_search_match(query=query) == match
+
+
+async def search(connection: aiosqlite.Connection, query: str) -> list[str]:
+    cursor = await connection.execute(
+        "SELECT e.id FROM events_search JOIN events e ON e.rowid = events_search.rowid "
+        "WHERE events_search MATCH ? ORDER BY e.id",
+        (Database.get_search_match(query=query),)
+    )
+    return [row[0] for row in await cursor.fetchall()]
+
+
+@pytest.mark.parametrize("query, ids", [
+    ("елка", ["tree"]),
+    ("ЁЛКИ", []),
+    ("ёлк", ["tree"]),
+    ("ҚАЗАҚ", ["kazakh"]),
+    ("rock OR opera", []),
+    ("rock OR", ["rock"]),
+    ('jazz" OR "елка', []),
+    ("NEAR(rock jazz)", ["rock"]),
+])
+def test_search_match_in_the_index(query, ids):
+    async def run():
+        async with aiosqlite.connect(":memory:") as connection:
+            await Migrations.migrate(connection=connection)
+            await connection.executemany(
+                "INSERT INTO events (id, title) VALUES (?, ?)",
+                [("tree", "Ёлка в Алматы"), ("kazakh", "Қазақ концерт"), ("rock", "Rock OR jazz near you")]
+            )
+            return await search(connection=connection, query=query)
+
+    assert asyncio.run(run()) == ids
+
+
+def test_events_are_keyed_on_a_rowid_a_vacuum_keeps(tmp_path):
+    async def run():
+        async with aiosqlite.connect(str(tmp_path / "db.sqlite")) as connection:
+            await Migrations.migrate(connection=connection)
+            cursor = await connection.execute("SELECT name, type FROM pragma_table_info('events') WHERE pk > 0")
+            keys = await cursor.fetchall()
+
+            await connection.executemany(
+                "INSERT INTO events (id, title) VALUES (?, ?)",
+                [("tree", "Ёлка в Алматы"), ("kazakh", "Қазақ концерт"), ("rock", "Rock OR jazz near you")]
+            )
+            await connection.execute("DELETE FROM events WHERE id = 'tree'")
+            # the parser upserts events by their id, the row keeps its rowid and its row in the index
+            await connection.execute(
+                "INSERT INTO events (id, title) VALUES ('rock', 'Rock and jazz') "
+                "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title"
+            )
+            await connection.commit()
+            await connection.execute("VACUUM")
+            return keys, [await search(connection=connection, query=query) for query in ("jazz", "қазақ", "елка")]
+
+    keys, found = asyncio.run(run())
+    assert keys == [("rowid", "INTEGER")]
+    assert found == [["rock"], ["kazakh"], []]
+
+
+def test_events_keep_their_rows_in_the_index_when_they_get_the_rowid_key(tmp_path, monkeypatch):
+    versions = Migrations.VERSIONS
+
+    async def run():
+        async with aiosqlite.connect(str(tmp_path / "db.sqlite")) as connection:
+            monkeypatch.setattr(Migrations, "VERSIONS", versions[:7])
+            await Migrations.migrate(connection=connection)
+            await connection.executemany(
+                "INSERT INTO events (id, title) VALUES (?, ?)",
+                [(f"event-{i}", f"Событие {i}") for i in range(10)]
+            )
+            await connection.execute("DELETE FROM events WHERE id IN ('event-0', 'event-5')")
+            await connection.commit()
+
+            monkeypatch.setattr(Migrations, "VERSIONS", versions)
+            applied = await Migrations.migrate(connection=connection)
+            return applied, [await search(connection=connection, query=f"событие {i}") for i in range(10)]
+
+    applied, found = asyncio.run(run())
+    assert applied == [8]
+    assert found == [[] if i in (0, 5) else [f"event-{i}"] for i in range(10)]
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import logging.config
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from helpers import Database
+from models.table_configurations import TableConfiguration
+from parsers import Crawler, PARSERS
+
+
+async def wait_for_server(session: aiohttp.ClientSession, url: str, process: subprocess.Popen):
+    while process.poll() is None:
+        try:
+            async with session.get(url=f"{url}/_replay/stats") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Replay server exited with code {process.returncode}")
+
+
+async def get_server_stats(session: aiohttp.ClientSession, url: str) -> dict:
+    async with session.get(url=f"{url}/_replay/stats") as response:
+        return await response.json()
+
+
+def get_peak_rss(who: int) -> float:
+    # linux reports the peak in kilobytes, macos in bytes
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+async def run(args, config: dict, directory: str) -> dict:
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.replay", args.archive,
+        "--port", str(args.port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--throttle-rate", str(args.throttle_rate)
+    ])
+
+    try:
+        async with aiohttp.ClientSession() as control:
+            await wait_for_server(session=control, url=url, process=server)
+
+            config["connection"]["sqlite"] = os.path.join(directory, "crawl.db")
+            config["files"] = os.path.join(directory, "files")
+            config["http_cache"]["directory"] = os.path.join(directory, "cache")
+            config["fixtures"]["record"] = None
+            config["fixtures"]["replay"] = url
+            config["metrics"]["summary"] = os.path.join(directory, "metrics.json")
+            config["metrics"]["port"] = None
+            config["incremental"] = False
+
+            # every run starts from an empty database with the schema of the migrations
+            tables = TableConfiguration()
+            db = Database(config=config, tables=tables)
+            await db.migrate()
+            async with aiohttp.ClientSession() as session:
+                crawler = Crawler(
+                    config=config,
+                    logger=logging.getLogger(name=config["app"]),
+                    db=db,
+                    tables=tables,
+                    session=session,
+                    parsers=[PARSERS[source] for source in config["sources"]]
+                )
+                start = time.perf_counter()
+                await crawler.parse()
+                elapsed = time.perf_counter() - start
+
+            stats = await get_server_stats(session=control, url=url)
+            with sqlite3.connect(config["connection"]["sqlite"]) as connection:
+                events, = connection.execute(f"SELECT COUNT(*) FROM {tables.EVENTS.NAME}").fetchone()
+            with open(config["metrics"]["summary"], 'r', encoding='utf-8') as file:
+                metrics = json.load(file)
+
+            return dict(
+                elapsed=elapsed,
+                events=events,
+                stats=stats,
+                stages=metrics["stages"],
+                # the replay server is still running, so children only counts the extraction processes
+                rss=get_peak_rss(who=resource.RUSAGE_SELF),
+                children_rss=get_peak_rss(who=resource.RUSAGE_CHILDREN)
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Crawl a recorded fixture archive end to end and report throughput")
+    arguments.add_argument("archive", help="fixture archive written with the fixtures.record option")
+    arguments.add_argument("--port", type=int, default=8790)
+    arguments.add_argument("--latency", type=float, default=0.05)
+    arguments.add_argument("--jitter", type=float, default=0)
+    arguments.add_argument("--error-rate", type=float, default=0)
+    arguments.add_argument("--throttle-rate", type=float, default=0)
+    arguments.add_argument("--verbose", action="store_true")
+    args = arguments.parse_args()
+
+    with open("config.json", 'r', encoding='utf-8') as file:
+        config = json.load(file)
+
+    if not args.verbose:
+        config["logger"]["loggers"][""]["level"] = "WARNING"
+    logging.config.dictConfig(config=config["logger"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = asyncio.run(run(args=args, config=config, directory=directory))
+
+    stats = result["stats"]
+    print(f"Events: {result['events']} in {result['elapsed']:.2f} seconds, "
+          f"{result['events'] / result['elapsed']:.1f} events/sec")
+    print(f"Requests: {stats['requests']}, {stats['requests'] / result['elapsed']:.1f} requests/sec, "
+          f"{stats['bytes'] / 1024 ** 2:.1f} MB served, {stats['missing']} missing fixtures, "
+          f"{stats['errors']} errors and {stats['throttled']} throttled injected")
+    for name, stage in result["stages"].items():
+        print(f"Stage {name}: {stage['count']} operations, {stage['errors']} errors, "
+              f"{stage['bytes'] / 1024:.1f} KB, latency p50 {stage['latency']['p50'] * 1000:.1f} ms, "
+              f"p95 {stage['latency']['p95'] * 1000:.1f} ms, max {stage['latency']['max'] * 1000:.1f} ms")
+    print(f"Peak RSS: {result['rss']:.1f} MB, extraction processes {result['children_rss']:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
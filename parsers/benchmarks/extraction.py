@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+from helpers import HttpCache
+from parsers.sxodim_extractor import SxodimExtractor
+from parsers.sxodim_parser import SxodimParser
+
+
+def get_paths(directory: str) -> list[str]:
+    # the http cache names bodies by the hash of their url, only event pages are picked from its index,
+    # every file of any other directory is taken for one
+    index_path = os.path.join(directory, HttpCache.INDEX)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as file:
+            urls = json.load(file)
+        cache = HttpCache(directory=directory, max_size=0)
+        return [cache.get_path(url=url) for url in sorted(urls) if "/event/" in urlsplit(url).path]
+
+    return [os.path.join(directory, filename) for filename in sorted(os.listdir(directory))]
+
+
+def load_pages(directory: str) -> list[bytes]:
+    pages = list()
+    for file_path in get_paths(directory=directory):
+        if not os.path.isfile(file_path):
+            continue
+
+        with open(file_path, 'rb') as file:
+            pages.append(file.read())
+    return pages
+
+
+def measure(extract, pages: list[bytes], repeat: int) -> tuple[float, list[dict]]:
+    results = list()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [extract(page) for page in pages]
+    return time.perf_counter() - start, results
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Compare event page extraction engines on saved pages")
+    arguments.add_argument("directory", help="directory with saved event pages, the http cache directory works too")
+    arguments.add_argument("--repeat", type=int, default=5)
+    args = arguments.parse_args()
+
+    pages = load_pages(directory=args.directory)
+    if len(pages) == 0:
+        print(f"No pages found in {args.directory}")
+        return
+
+    soup_time, soup_results = measure(extract=SxodimParser.extract_event_page, pages=pages, repeat=args.repeat)
+    lxml_time, lxml_results = measure(extract=SxodimExtractor.extract, pages=pages, repeat=args.repeat)
+    mismatches = sum(1 for soup, lxml in zip(soup_results, lxml_results) if soup != lxml)
+
+    total = len(pages) * args.repeat
+    print(f"Pages: {len(pages)}, repeat: {args.repeat}")
+    print(f"BeautifulSoup: {soup_time:.3f} seconds, {total / soup_time:.1f} pages/sec")
+    print(f"lxml: {lxml_time:.3f} seconds, {total / lxml_time:.1f} pages/sec")
+    print(f"Speedup: {soup_time / lxml_time:.2f}x, mismatched pages: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
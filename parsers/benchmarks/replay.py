@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import mimetypes
+import random
+
+from aiohttp import web
+
+from helpers import Recorder
+
+
+class ReplayServer:
+    def __init__(self, recorder: Recorder, latency: float, jitter: float, error_rate: float, throttle_rate: float):
+        self._recorder = recorder
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._throttle_rate = throttle_rate
+        self.Stats = dict(requests=0, bytes=0, missing=0, errors=0, throttled=0)
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_replay/stats", self.get_stats)
+        app.router.add_route("*", "/{path:.*}", self.replay)
+        return app
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.Stats)
+
+    async def replay(self, request: web.Request) -> web.Response:
+        self.Stats["requests"] += 1
+        delay = self._latency + random.uniform(0, self._jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        chance = random.random()
+        if chance < self._throttle_rate:
+            self.Stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        if chance < self._throttle_rate + self._error_rate:
+            self.Stats["errors"] += 1
+            return web.Response(status=503)
+
+        # the first path segment is the recorded host, the rest is its original path and query
+        path = request.rel_url.raw_path.lstrip("/")
+        query = request.rel_url.raw_query_string
+        data = await request.read()
+        key = Recorder.get_key(
+            method=request.method,
+            url=f"https://{path}" + (f"?{query}" if query else ""),
+            data=data or None
+        )
+
+        entry = self._recorder.get(key)
+        if entry is None:
+            self.Stats["missing"] += 1
+            return web.Response(status=404, text=f"No fixture for {key}")
+
+        with open(self._recorder.get_path(entry=entry), 'rb') as file:
+            content = file.read()
+        self.Stats["bytes"] += len(content)
+
+        content_type = entry["content_type"] or mimetypes.guess_type(path)[0] or "text/html"
+        return web.Response(status=entry["status"], body=content, content_type=content_type)
+
+
+def main():
+    arguments = argparse.ArgumentParser(description="Serve recorded responses as the sites they were recorded from")
+    arguments.add_argument("directory", help="fixture archive written with the fixtures.record option")
+    arguments.add_argument("--host", default="127.0.0.1")
+    arguments.add_argument("--port", type=int, default=8790)
+    arguments.add_argument("--latency", type=float, default=0, help="seconds added to every response")
+    arguments.add_argument("--jitter", type=float, default=0, help="up to this many seconds added on top at random")
+    arguments.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 503")
+    arguments.add_argument("--throttle-rate", type=float, default=0, help="share of requests answered with 429")
+    arguments.add_argument("--seed", type=int, default=None)
+    args = arguments.parse_args()
+
+    random.seed(args.seed)
+    recorder = Recorder(directory=args.directory)
+    recorder.load()
+
+    server = ReplayServer(
+        recorder=recorder,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate
+    )
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
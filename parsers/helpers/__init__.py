@@ -1,3 +1,14 @@
 from helpers.database import Database
 from helpers.mapper import ForeignKeyMapper
 from helpers.storage import Storage
+from helpers.locks import FileLock
+from helpers.governor import Governor, ResponseError
+from helpers.scheduler import Scheduler
+from helpers.photos import PhotoStorage
+from helpers.http_cache import HttpCache
+from helpers.writer import Writer
+from helpers.dates import Dates
+from helpers.recorder import Recorder
+from helpers.metrics import Metrics
+from helpers.profiler import Profiler
+from helpers.migrations import Migrations
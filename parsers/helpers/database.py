@@ -1,6 +1,8 @@
 import aiosqlite
+import time
 from dateutil import parser
 
+from helpers.migrations import Migrations
 from models.table_configurations import TableConfiguration
 
 
@@ -8,6 +10,42 @@ class Database:
     def __init__(self, config: dict, tables: TableConfiguration):
         self._config = config
         self._tables = tables
+        self._connection = None
+
+    async def connect(self):
+        if self._connection is None:
+            self._connection = await aiosqlite.connect(
+                self._config['connection']['sqlite'],
+                timeout=self._config['connection']['timeout']
+            )
+
+    async def disconnect(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def migrate(self) -> list[int]:
+        async with aiosqlite.connect(
+            self._config['connection']['sqlite'],
+            timeout=self._config['connection']['timeout']
+        ) as connection:
+            # several worker processes write at once, wal lets them read while one of them writes
+            await connection.execute("PRAGMA journal_mode=WAL")
+            return await Migrations.migrate(connection=connection)
+
+    async def write(self, batches: list):
+        # every table of the batch goes in one transaction on the long-lived connection
+        try:
+            for table, data in batches:
+                column_names = ", ".join(table.COLUMNS)
+                placeholders = ", ".join(["?"] * len(table.COLUMNS))
+
+                query = f"INSERT INTO main.{table.NAME}  ({column_names}) VALUES ({placeholders}) {table.ON_CONFLICT}"
+                await self._connection.executemany(query, data)
+            await self._connection.commit()
+        except Exception:
+            await self._connection.rollback()
+            raise
 
     async def insert(self, table: str, columns: list, data: list, on_conflict="ON CONFLICT DO NOTHING"):
         async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
@@ -31,12 +69,168 @@ class Database:
 
     async def get_events_as_dict(self):
         async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
-            query = f"SELECT src_id, city_id, start, end, {self._tables.EVENTS.PRIMARY_KEY} FROM main.{self._tables.EVENTS.NAME}"
+            query = f"""
+                SELECT source_id, src_id, city_id, start, end, {self._tables.EVENTS.PRIMARY_KEY}
+                FROM main.{self._tables.EVENTS.NAME}
+            """
             cursor = await connection.execute(query)
             data = await cursor.fetchall()
 
         result = dict()
         for row in data:
-            result[f"{row[0]}{row[1]}{row[2]}{row[3]}"] = row[4]
+            result[(row[0], row[1], row[2], row[3], row[4])] = row[5]
         return result
 
+    async def get_events_ids(self, keys: list[tuple]):
+        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+            placeholders = ", ".join(["(?, ?, ?)"] * len(keys))
+            # joining the keys as a table lets sqlite search the (src_id, city_id, ...) index for each of them
+            query = f"""
+                SELECT e.source_id, e.src_id, e.city_id, e.start, e.end, e.{self._tables.EVENTS.PRIMARY_KEY}
+                FROM (VALUES {placeholders}) AS k
+                JOIN main.{self._tables.EVENTS.NAME} AS e
+                ON e.src_id = k.column2 AND e.city_id = k.column3 AND e.source_id = k.column1
+            """
+            cursor = await connection.execute(query, [value for key in keys for value in key])
+            data = await cursor.fetchall()
+
+        result = dict()
+        for row in data:
+            result[(row[0], row[1], row[2], row[3], row[4])] = row[5]
+        return result
+
+    async def get_events_hashes(self, keys: list[tuple] = None):
+        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+            query = f"SELECT source_id, src_id, city_id, hash FROM main.{self._tables.EVENTS_HASHES.NAME}"
+            parameters = list()
+            if keys is not None:
+                placeholders = ", ".join(["(?, ?, ?)"] * len(keys))
+                query = f"""
+                    SELECT h.source_id, h.src_id, h.city_id, h.hash
+                    FROM (VALUES {placeholders}) AS k
+                    JOIN main.{self._tables.EVENTS_HASHES.NAME} AS h
+                    ON h.source_id = k.column1 AND h.src_id = k.column2 AND h.city_id = k.column3
+                """
+                parameters = [value for key in keys for value in key]
+            cursor = await connection.execute(query, parameters)
+            data = await cursor.fetchall()
+
+        result = dict()
+        for row in data:
+            result[(row[0], row[1], row[2])] = row[3]
+        return result
+
+    async def get_checkpoint(self, source: str, city: str) -> tuple[list, list]:
+        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+            query = f"""
+                SELECT source, city, date, page, done FROM main.{self._tables.CRAWL_DATES.NAME}
+                WHERE source = ? AND city = ?
+            """
+            cursor = await connection.execute(query, [source, city])
+            dates = await cursor.fetchall()
+
+            query = f"""
+                SELECT source, city, slug, event, processed FROM main.{self._tables.CRAWL_EVENTS.NAME}
+                WHERE source = ? AND city = ?
+            """
+            cursor = await connection.execute(query, [source, city])
+            events = await cursor.fetchall()
+
+        return dates, events
+
+    async def clear_checkpoints(self):
+        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+            await connection.execute(f"DELETE FROM main.{self._tables.CRAWL_DATES.NAME}")
+            await connection.execute(f"DELETE FROM main.{self._tables.CRAWL_EVENTS.NAME}")
+            await connection.commit()
+
+    async def enqueue_jobs(self, jobs: list[tuple], reset: bool):
+        async with aiosqlite.connect(
+            self._config['connection']['sqlite'],
+            timeout=self._config['connection']['timeout']
+        ) as connection:
+            if reset:
+                await connection.execute(f"DELETE FROM main.{self._tables.CRAWL_JOBS.NAME}")
+
+            # a city that is not done yet is crawled with the dates discovered last
+            query = f"""
+                INSERT INTO main.{self._tables.CRAWL_JOBS.NAME} (source, city, dates, status, attempts)
+                VALUES (?, ?, ?, 'pending', 0)
+                ON CONFLICT (source, city) DO UPDATE SET dates = EXCLUDED.dates
+                WHERE {self._tables.CRAWL_JOBS.NAME}.status <> 'done'
+            """
+            await connection.executemany(query, jobs)
+            await connection.commit()
+
+    async def claim_job(self, worker: str, lease: float, attempts: int) -> tuple | None:
+        async with aiosqlite.connect(
+            self._config['connection']['sqlite'],
+            timeout=self._config['connection']['timeout']
+        ) as connection:
+            now = time.time()
+            # a job whose worker died and that has used up its attempts is given up instead of reclaimed
+            await connection.execute(
+                f"""
+                UPDATE main.{self._tables.CRAWL_JOBS.NAME} SET status = 'failed', worker = NULL, lease_until = NULL
+                WHERE status = 'leased' AND lease_until < ? AND attempts >= ?
+                """,
+                [now, attempts]
+            )
+            # jobs of all sources are taken in turns, so every source keeps progressing
+            cursor = await connection.execute(
+                f"""
+                UPDATE main.{self._tables.CRAWL_JOBS.NAME}
+                SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1
+                WHERE rowid = (
+                    SELECT rowid FROM main.{self._tables.CRAWL_JOBS.NAME}
+                    WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?)
+                    ORDER BY attempts, city, source
+                    LIMIT 1
+                )
+                RETURNING source, city, dates, status, worker, lease_until, attempts
+                """,
+                [worker, now + lease, now]
+            )
+            job = await cursor.fetchone()
+            await connection.commit()
+
+        return job
+
+    async def extend_lease(self, source: str, city: str, worker: str, lease: float) -> bool:
+        async with aiosqlite.connect(
+            self._config['connection']['sqlite'],
+            timeout=self._config['connection']['timeout']
+        ) as connection:
+            cursor = await connection.execute(
+                f"""
+                UPDATE main.{self._tables.CRAWL_JOBS.NAME} SET lease_until = ?
+                WHERE source = ? AND city = ? AND worker = ? AND status = 'leased'
+                """,
+                [time.time() + lease, source, city, worker]
+            )
+            await connection.commit()
+
+        return cursor.rowcount > 0
+
+    async def release_job(self, source: str, city: str, worker: str, attempts: int):
+        async with aiosqlite.connect(
+            self._config['connection']['sqlite'],
+            timeout=self._config['connection']['timeout']
+        ) as connection:
+            await connection.execute(
+                f"""
+                UPDATE main.{self._tables.CRAWL_JOBS.NAME}
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker = NULL, lease_until = NULL
+                WHERE source = ? AND city = ? AND worker = ? AND status = 'leased'
+                """,
+                [attempts, source, city, worker]
+            )
+            await connection.commit()
+
+    async def count_jobs(self) -> dict:
+        async with aiosqlite.connect(self._config['connection']['sqlite']) as connection:
+            query = f"SELECT status, count(*) FROM main.{self._tables.CRAWL_JOBS.NAME} GROUP BY status"
+            cursor = await connection.execute(query)
+            data = await cursor.fetchall()
+
+        return {row[0]: row[1] for row in data}
@@ -0,0 +1,191 @@
+import asyncio
+import contextlib
+import random
+from logging import Logger
+from typing import Awaitable, Callable
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+class ResponseError(Exception):
+    def __init__(self, status: int, retry_after: str = None):
+        super().__init__(f"Incorrect response status {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class HostLimiter:
+    def __init__(self, rate: float, burst: int, concurrency: int, reserve: int):
+        self.rate = rate
+        self.limit = concurrency
+        self.tokens = burst
+        self.updated = None
+        self.active = 0
+        self.paused_until = 0
+        self.last_decrease = 0
+        self.retry_tokens = reserve
+        self.condition = asyncio.Condition()
+        self.Stats = dict(requests=0, retries=0, throttled=0, errors=0, slow=0, budget_exhausted=0)
+
+
+class Governor:
+    def __init__(self, logger: Logger, rate: float, min_rate: float, max_rate: float, burst: int,
+                 concurrency: int, min_concurrency: int, max_concurrency: int, latency: float,
+                 increase: float, decrease: float, attempts: int, budget: float, reserve: int, backoff: float):
+        self._logger = logger
+        self._rate = rate
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._burst = burst
+        self._concurrency = concurrency
+        self._min_concurrency = min_concurrency
+        self._max_concurrency = max_concurrency
+        self._latency = latency
+        self._increase = increase
+        self._decrease = decrease
+        self._attempts = attempts
+        self._budget = budget
+        self._reserve = reserve
+        self._backoff = backoff
+        self._hosts = dict()
+
+    def host(self, url: str) -> HostLimiter:
+        host = urlsplit(url).netloc
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = HostLimiter(
+                rate=self._rate,
+                burst=self._burst,
+                concurrency=self._concurrency,
+                reserve=self._reserve
+            )
+            self._hosts[host] = limiter
+        return limiter
+
+    async def call(self, url: str, request: Callable[[], Awaitable]):
+        limiter = self.host(url)
+        limiter.Stats["requests"] += 1
+        limiter.retry_tokens = min(limiter.retry_tokens + self._budget, self._reserve)
+
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except Exception as e:
+                attempt += 1
+                if not self.is_retryable(error=e) or attempt >= self._attempts:
+                    raise
+
+                # retries are paid from a budget refilled by a share of the requests, so an outage is not multiplied
+                if limiter.retry_tokens < 1:
+                    limiter.Stats["budget_exhausted"] += 1
+                    raise
+                limiter.retry_tokens -= 1
+                limiter.Stats["retries"] += 1
+
+                delay = self.get_retry_delay(error=e, attempt=attempt)
+                self._logger.warning(f"Request {url} failed with error {e}, retrying in {delay:.2f} seconds")
+                await asyncio.sleep(delay)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str, semaphore: asyncio.Semaphore = None):
+        limiter = self.host(url)
+        await self.acquire(limiter=limiter)
+        try:
+            async with semaphore or contextlib.nullcontext():
+                await self.take_token(limiter=limiter)
+                started = asyncio.get_running_loop().time()
+                try:
+                    yield
+                except (ResponseError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self.record(limiter=limiter, elapsed=asyncio.get_running_loop().time() - started, error=e)
+                    raise
+                self.record(limiter=limiter, elapsed=asyncio.get_running_loop().time() - started, error=None)
+        finally:
+            async with limiter.condition:
+                limiter.active -= 1
+                limiter.condition.notify_all()
+
+    async def acquire(self, limiter: HostLimiter):
+        async with limiter.condition:
+            await limiter.condition.wait_for(lambda: limiter.active < int(limiter.limit))
+            limiter.active += 1
+
+    async def take_token(self, limiter: HostLimiter):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if now < limiter.paused_until:
+                await asyncio.sleep(limiter.paused_until - now)
+                continue
+
+            if limiter.updated is not None:
+                limiter.tokens = min(limiter.tokens + (now - limiter.updated) * limiter.rate, self._burst)
+            limiter.updated = now
+
+            if limiter.tokens >= 1:
+                limiter.tokens -= 1
+                return
+            await asyncio.sleep((1 - limiter.tokens) / limiter.rate)
+
+    def record(self, limiter: HostLimiter, elapsed: float, error: Exception | None):
+        now = asyncio.get_running_loop().time()
+        congested = False
+        if isinstance(error, ResponseError):
+            if error.status == 429 or error.status >= 500:
+                limiter.Stats["throttled"] += 1
+                congested = True
+                retry_after = self.parse_retry_after(value=error.retry_after)
+                if retry_after is not None:
+                    limiter.paused_until = max(limiter.paused_until, now + retry_after)
+        elif error is not None:
+            limiter.Stats["errors"] += 1
+            congested = True
+        elif elapsed > self._latency:
+            limiter.Stats["slow"] += 1
+            congested = True
+
+        if congested:
+            # requests in flight all see the same overload, so the limits are cut once per round trip
+            if now - limiter.last_decrease >= elapsed:
+                limiter.limit = max(limiter.limit * self._decrease, self._min_concurrency)
+                limiter.rate = max(limiter.rate * self._decrease, self._min_rate)
+                limiter.last_decrease = now
+        elif error is None:
+            # until the host first pushes back the limits grow with every success, like a tcp slow start,
+            # afterwards by one slot and increase requests per second for every window of limit successes
+            step = 1 if limiter.last_decrease == 0 else 1 / limiter.limit
+            limiter.limit = min(limiter.limit + step, self._max_concurrency)
+            limiter.rate = min(limiter.rate + self._increase * step, self._max_rate)
+
+    def get_retry_delay(self, error: Exception, attempt: int) -> float:
+        if isinstance(error, ResponseError):
+            retry_after = self.parse_retry_after(value=error.retry_after)
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, self._backoff * 2 ** attempt)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, ResponseError):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    @staticmethod
+    def parse_retry_after(value: str | None) -> float | None:
+        try:
+            return max(float(value), 0)
+        except (TypeError, ValueError):
+            return None
+
+    def metrics(self) -> dict:
+        return {
+            host: dict(
+                rate=round(limiter.rate, 2),
+                concurrency=int(limiter.limit),
+                active=limiter.active,
+                **limiter.Stats
+            )
+            for host, limiter in self._hosts.items()
+        }
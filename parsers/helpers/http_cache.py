@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+import aiofiles
+
+from helpers.locks import FileLock
+
+
+class HttpCache:
+    INDEX = "index.json"
+
+    def __init__(self, directory: str, max_size: int):
+        self._directory = directory
+        self._max_size = max_size
+        self._entries = dict()
+        self._revalidated = set()
+        self._size = 0
+        self.Stats = dict(hits=0, misses=0, evictions=0)
+
+    def load(self):
+        os.makedirs(self._directory, exist_ok=True)
+        self._entries = self.read_index()
+        self._size = sum(entry["size"] for entry in self._entries.values())
+
+    def read_index(self) -> dict:
+        index_path = os.path.join(self._directory, self.INDEX)
+        if not os.path.exists(index_path):
+            return dict()
+        with open(index_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save(self):
+        index_path = os.path.join(self._directory, self.INDEX)
+        # workers share the directory, the index on disk may have gained their pages since it was loaded, ours go
+        # last as the most recently used and an entry whose file one of us evicted is dropped
+        with FileLock(path=f"{index_path}.lock"):
+            entries = self.read_index()
+            for url in self._entries:
+                entries.pop(url, None)
+            entries.update(self._entries)
+
+            self._entries = {url: entry for url, entry in entries.items() if os.path.exists(self.get_path(url=url))}
+            self._size = sum(entry["size"] for entry in self._entries.values())
+            self.evict()
+
+            with open(f"{index_path}.{os.getpid()}.tmp", 'w', encoding='utf-8') as file:
+                json.dump(self._entries, file, ensure_ascii=False)
+            os.replace(f"{index_path}.{os.getpid()}.tmp", index_path)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get_headers(self, url: str) -> dict:
+        entry = self._entries.get(url)
+        if entry is None:
+            return dict()
+
+        headers = dict()
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def read(self, url: str) -> bytes | None:
+        entry = self._entries.get(url)
+        file_path = self.get_path(url=url)
+        if entry is None or not os.path.exists(file_path):
+            return None
+
+        # entries are kept in access order, the first one is evicted first
+        self._entries[url] = self._entries.pop(url)
+        self._revalidated.add(url)
+        self.Stats["hits"] += 1
+
+        async with aiofiles.open(file_path, 'rb') as file:
+            return await file.read()
+
+    async def store(self, url: str, content: bytes, content_type: str | None, etag: str | None,
+                    last_modified: str | None):
+        self.Stats["misses"] += 1
+        self.discard(url=url)
+        if not etag and not last_modified:
+            return
+
+        file_path = self.get_path(url=url)
+        async with aiofiles.open(f"{file_path}.{os.getpid()}.tmp", 'wb') as file:
+            await file.write(content)
+        os.replace(f"{file_path}.{os.getpid()}.tmp", file_path)
+
+        self._entries[url] = dict(
+            etag=etag,
+            last_modified=last_modified,
+            content_type=content_type,
+            size=len(content),
+            data=None
+        )
+        self._size += len(content)
+        self.evict()
+
+    def discard(self, url: str):
+        entry = self._entries.pop(url, None)
+        self._revalidated.discard(url)
+        if entry is None:
+            return
+
+        self._size -= entry["size"]
+        file_path = self.get_path(url=url)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def evict(self):
+        while self._size > self._max_size and len(self._entries) > 0:
+            self.discard(url=next(iter(self._entries)))
+            self.Stats["evictions"] += 1
+
+    def get_content_type(self, url: str) -> str | None:
+        # entries stored before the content type was kept have none
+        entry = self._entries.get(url)
+        return entry.get("content_type") if entry is not None else None
+
+    def get_data(self, url: str) -> dict | None:
+        # data extracted from a body is only valid while the server confirms the body did not change
+        if url not in self._revalidated:
+            return None
+        return self._entries[url]["data"]
+
+    def set_data(self, url: str, data: dict):
+        entry = self._entries.get(url)
+        if entry is not None:
+            entry["data"] = data
+
+    def get_path(self, url: str) -> str:
+        return os.path.join(self._directory, hashlib.sha1(url.encode("utf-8")).hexdigest())
@@ -0,0 +1,35 @@
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # windows has no fcntl, msvcrt locks the first byte of the file instead
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    def __init__(self, path: str):
+        self._path = path
+        self._file = None
+
+    def __enter__(self):
+        # held across processes until the block ends, the workers of a crawl share its directories
+        self._file = open(self._path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0, os.SEEK_SET)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0, os.SEEK_SET)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
@@ -1,4 +1,5 @@
 import asyncio
+from collections import OrderedDict
 
 from helpers import Database
 from models.Sources import Sources
@@ -6,23 +7,27 @@ from models.table_configurations import TableConfiguration
 
 
 class ForeignKeyMapper:
-    def __init__(self, db: Database, tables: TableConfiguration):
+    def __init__(self, db: Database, tables: TableConfiguration, lazy: bool = False, cache_size: int = 0,
+                 batch: int = 400):
         self._db = db
         self._tables = tables
+        # lazy mode resolves events and hashes on demand and keeps only the most recent keys
+        self._lazy = lazy
+        self._cache_size = cache_size
+        self._batch = batch
         self.Cities = dict()
         self.Categories = dict()
         self.Locations = dict()
-        self.Events = dict()
+        self.Events = OrderedDict() if lazy else dict()
+        self.Hashes = OrderedDict() if lazy else dict()
         self.Dates = dict()
         self.Sources = Sources()
 
     async def fill_all(self):
-        await asyncio.gather(
-            self.fill_cities(),
-            self.fill_categories(),
-            self.fill_locations(),
-            self.fill_events()
-        )
+        fills = [self.fill_cities(), self.fill_categories(), self.fill_locations()]
+        if not self._lazy:
+            fills += [self.fill_events(), self.fill_hashes()]
+        await asyncio.gather(*fills)
 
     async def fill_cities(self):
         self.Cities = await self._db.get_as_dict(
@@ -39,7 +44,7 @@ class ForeignKeyMapper:
         )
 
     async def fill_locations(self):
-        self.Categories = await self._db.get_as_dict(
+        self.Locations = await self._db.get_as_dict(
             self._tables.LOCATIONS.UNIQUE_COLUMN,
             self._tables.LOCATIONS.PRIMARY_KEY,
             self._tables.LOCATIONS.NAME,
@@ -47,3 +52,53 @@ class ForeignKeyMapper:
 
     async def fill_events(self):
         self.Events = await self._db.get_events_as_dict()
+
+    async def fill_hashes(self):
+        self.Hashes = await self._db.get_events_hashes()
+
+    async def get_event_ids(self, keys: list[tuple]) -> dict:
+        # keys are (source_id, src_id, city_id, start, end), sources number their events independently
+        if not self._lazy:
+            return {key: self.Events.get(key) for key in keys}
+
+        return await self.resolve(
+            cache=self.Events,
+            keys=keys,
+            pairs=lambda missing: [(key[0], key[1], key[2]) for key in missing],
+            load=self._db.get_events_ids
+        )
+
+    async def get_hashes(self, keys: list[tuple]) -> dict:
+        # keys are (source_id, src_id, city_id)
+        if not self._lazy:
+            return {key: self.Hashes.get(key) for key in keys}
+
+        return await self.resolve(cache=self.Hashes, keys=keys, pairs=list, load=self._db.get_events_hashes)
+
+    async def resolve(self, cache: OrderedDict, keys: list[tuple], pairs, load) -> dict:
+        result = dict()
+        missing = list()
+        for key in keys:
+            if key in cache:
+                cache.move_to_end(key)
+                result[key] = cache[key]
+            else:
+                missing.append(key)
+
+        lookups = list(dict.fromkeys(pairs(missing)))
+        found = dict()
+        for i in range(0, len(lookups), self._batch):
+            found.update(await load(keys=lookups[i:i + self._batch]))
+
+        for key in missing:
+            # keys that are not in the database are remembered too, so they are not asked for again
+            result[key] = found.get(key)
+            self.remember(cache=cache, key=key, value=result[key])
+
+        return result
+
+    def remember(self, cache: OrderedDict, key: tuple, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self._cache_size:
+            cache.popitem(last=False)
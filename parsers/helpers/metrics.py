@@ -0,0 +1,145 @@
+import contextlib
+import json
+import os
+import time
+
+from aiohttp import web
+
+
+class Sample:
+    def __init__(self):
+        self.bytes = 0
+
+
+class Stage:
+    # upper bounds of the latency buckets in seconds, the last bucket takes everything slower
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = 0
+        self.max = 0
+        self.buckets = [0] * (len(self.BUCKETS) + 1)
+
+    def observe(self, elapsed: float, size: int, error: bool):
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.bytes += size
+        self.latency += elapsed
+        self.max = max(self.max, elapsed)
+
+        for index, bound in enumerate(self.BUCKETS):
+            if elapsed <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def get_quantile(self, quantile: float) -> float:
+        if self.count == 0:
+            return 0
+
+        # linear inside the bucket the quantile falls into, as prometheus estimates it
+        rank = quantile * self.count
+        seen = 0
+        lower = 0
+        for count, upper in zip(self.buckets, (*self.BUCKETS, self.max)):
+            if count > 0 and seen + count >= rank:
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = upper
+        return self.max
+
+    def summary(self) -> dict:
+        return dict(
+            count=self.count,
+            errors=self.errors,
+            bytes=self.bytes,
+            latency=dict(
+                total=round(self.latency, 3),
+                mean=round(self.latency / self.count, 4) if self.count > 0 else 0,
+                p50=round(self.get_quantile(0.5), 4),
+                p95=round(self.get_quantile(0.95), 4),
+                p99=round(self.get_quantile(0.99), 4),
+                max=round(self.max, 4)
+            ),
+            buckets={
+                str(bound): count for bound, count in zip((*self.BUCKETS, "+Inf"), self.buckets)
+            }
+        )
+
+
+class Metrics:
+    def __init__(self):
+        self._stages = dict()
+        self._started = time.time()
+        self._runner = None
+
+    def stage(self, name: str) -> Stage:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = Stage()
+            self._stages[name] = stage
+        return stage
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        sample = Sample()
+        started = time.perf_counter()
+        try:
+            yield sample
+        except Exception:
+            self.stage(name=stage).observe(elapsed=time.perf_counter() - started, size=sample.bytes, error=True)
+            raise
+        self.stage(name=stage).observe(elapsed=time.perf_counter() - started, size=sample.bytes, error=False)
+
+    def summary(self) -> dict:
+        return dict(
+            started=self._started,
+            elapsed=round(time.time() - self._started, 3),
+            stages={name: stage.summary() for name, stage in self._stages.items()}
+        )
+
+    def save(self, path: str):
+        with open(f"{path}.{os.getpid()}.tmp", 'w', encoding='utf-8') as file:
+            json.dump(self.summary(), file, indent=2)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def to_prometheus(self) -> str:
+        lines = list()
+        for family, field in (("operations", "count"), ("errors", "errors"), ("bytes", "bytes")):
+            lines.append(f"# TYPE crawl_stage_{family}_total counter")
+            for name, stage in self._stages.items():
+                lines.append(f'crawl_stage_{family}_total{{stage="{name}"}} {getattr(stage, field)}')
+
+        lines.append("# TYPE crawl_stage_latency_seconds histogram")
+        for name, stage in self._stages.items():
+            cumulative = 0
+            for bound, count in zip((*Stage.BUCKETS, "+Inf"), stage.buckets):
+                cumulative += count
+                lines.append(f'crawl_stage_latency_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'crawl_stage_latency_seconds_sum{{stage="{name}"}} {stage.latency}')
+            lines.append(f'crawl_stage_latency_seconds_count{{stage="{name}"}} {stage.count}')
+
+        lines.append("# TYPE crawl_elapsed_seconds gauge")
+        lines.append(f"crawl_elapsed_seconds {time.time() - self._started}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get("/metrics", self.get_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=host, port=port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def get_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.to_prometheus(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
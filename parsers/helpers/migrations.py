@@ -0,0 +1,400 @@
+import hashlib
+import time
+
+import aiosqlite
+
+
+class Migrations:
+    # applied in order and recorded in schema_migrations, a released version is never changed, a new one is added
+    VERSIONS = [
+        (1, "initial schema", [
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                slug TEXT UNIQUE
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS cities (
+                id TEXT PRIMARY KEY,
+                name TEXT UNIQUE,
+                slug TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS categories (
+                id TEXT PRIMARY KEY,
+                name TEXT UNIQUE
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS locations (
+                id TEXT PRIMARY KEY,
+                name TEXT UNIQUE
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id TEXT PRIMARY KEY,
+                src_id INTEGER,
+                title TEXT,
+                photo TEXT,
+                short_description TEXT,
+                description TEXT,
+                phone TEXT,
+                link TEXT,
+                location_id TEXT,
+                source_id INTEGER,
+                city_id TEXT,
+                ticket_url TEXT,
+                url TEXT,
+                category_id TEXT,
+                start REAL,
+                end REAL,
+                relevance TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS events_prices (
+                id TEXT PRIMARY KEY,
+                event_id TEXT,
+                date REAL,
+                price REAL,
+                row INTEGER,
+                column INTEGER,
+                sector TEXT,
+                available INTEGER,
+                UNIQUE (event_id, date, price, row, column, sector)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS events_hashes (
+                src_id INTEGER NOT NULL,
+                city_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (src_id, city_id)
+            )
+            """
+        ]),
+        # progress tables only hold an unfinished crawl, the layout without sources is rebuilt instead of copied
+        (2, "crawl progress by source", [
+            "DROP TABLE IF EXISTS crawl_dates",
+            "DROP TABLE IF EXISTS crawl_events",
+            "DROP TABLE IF EXISTS crawl_jobs",
+            """
+            CREATE TABLE crawl_dates (
+                source TEXT NOT NULL,
+                city TEXT NOT NULL,
+                date TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                done INTEGER NOT NULL,
+                PRIMARY KEY (source, city, date)
+            )
+            """,
+            """
+            CREATE TABLE crawl_events (
+                source TEXT NOT NULL,
+                city TEXT NOT NULL,
+                slug TEXT NOT NULL,
+                event TEXT NOT NULL,
+                processed INTEGER NOT NULL,
+                PRIMARY KEY (source, city, slug)
+            )
+            """,
+            """
+            CREATE TABLE crawl_jobs (
+                source TEXT NOT NULL,
+                city TEXT NOT NULL,
+                date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, city, date)
+            )
+            """
+        ]),
+        (3, "indexes for the hot queries", [
+            # the lookup of known events by their source keys while crawling
+            "CREATE INDEX IF NOT EXISTS events_src_id_city_id_start_end ON events (src_id, city_id, start, end)",
+            # /all and its count, upcoming events first, the optional filters are checked in the index
+            "CREATE INDEX IF NOT EXISTS events_start_day ON events (date(start), city_id, category_id)",
+            "CREATE INDEX IF NOT EXISTS events_end_day ON events (date(end))",
+            # the filters of /get/filters group events by category without reading the rows
+            "CREATE INDEX IF NOT EXISTS events_category_id ON events (category_id)",
+            # prices of an event on a day come out of the index in seat order, sectors in price order
+            "CREATE INDEX IF NOT EXISTS events_prices_seats ON events_prices (event_id, date(date), row, column)",
+            "CREATE INDEX IF NOT EXISTS events_prices_sectors ON events_prices (event_id, date(date), price, sector)"
+        ]),
+        # the utc calendar day of a julian date as an integer, the julian day number, so a filter on days is a plain
+        # range an index can serve, a julian date starts at noon, hence the half day
+        (4, "day columns of events", [
+            "ALTER TABLE events ADD COLUMN start_day INTEGER GENERATED ALWAYS AS (CAST(start + 0.5 AS INTEGER))",
+            "ALTER TABLE events ADD COLUMN end_day INTEGER GENERATED ALWAYS AS (CAST(end + 0.5 AS INTEGER))",
+            "DROP INDEX IF EXISTS events_start_day",
+            "DROP INDEX IF EXISTS events_end_day",
+            "CREATE INDEX events_start_day ON events (start_day, city_id, category_id)",
+            "CREATE INDEX events_end_day ON events (end_day)"
+        ]),
+        # unicode61 folds case in every script but drops diacritics of latin letters only, so ё is indexed as е,
+        # rows of the index carry the rowid of their event, sqlite only promises a VACUUM keeps the rowids of tables
+        # with an integer primary key, which events get in version 8
+        (5, "full text search of events", [
+            """
+            CREATE VIRTUAL TABLE events_search USING fts5(
+                title,
+                short_description,
+                description,
+                location,
+                category,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """,
+            # a match in the title ranks above one in the description
+            "INSERT INTO events_search (events_search, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 2.0, 2.0)')",
+            """
+            INSERT INTO events_search (rowid, title, short_description, description, location, category)
+            SELECT
+                e.rowid,
+                replace(replace(e.title, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(e.short_description, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(e.description, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(l.name, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(c.name, 'ё', 'е'), 'Ё', 'Е')
+            FROM events e
+            LEFT JOIN locations l ON l.id = e.location_id
+            LEFT JOIN categories c ON c.id = e.category_id
+            """,
+            """
+            CREATE TRIGGER events_search_insert AFTER INSERT ON events BEGIN
+                INSERT INTO events_search (rowid, title, short_description, description, location, category)
+                SELECT
+                    NEW.rowid,
+                    replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.short_description, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.description, 'ё', 'е'), 'Ё', 'Е'),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM locations WHERE id = NEW.location_id),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM categories WHERE id = NEW.category_id);
+            END
+            """,
+            # an upsert updates every column, only events whose text changed are indexed again
+            """
+            CREATE TRIGGER events_search_update AFTER UPDATE ON events
+            WHEN OLD.title IS NOT NEW.title
+                OR OLD.short_description IS NOT NEW.short_description
+                OR OLD.description IS NOT NEW.description
+                OR OLD.location_id IS NOT NEW.location_id
+                OR OLD.category_id IS NOT NEW.category_id
+            BEGIN
+                DELETE FROM events_search WHERE rowid = OLD.rowid;
+                INSERT INTO events_search (rowid, title, short_description, description, location, category)
+                SELECT
+                    NEW.rowid,
+                    replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.short_description, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.description, 'ё', 'е'), 'Ё', 'Е'),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM locations WHERE id = NEW.location_id),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM categories WHERE id = NEW.category_id);
+            END
+            """,
+            """
+            CREATE TRIGGER events_search_delete AFTER DELETE ON events BEGIN
+                DELETE FROM events_search WHERE rowid = OLD.rowid;
+            END
+            """
+        ]),
+        # a job crawls every date of a city, so an event listed on many dates is fetched once, the jobs of a crawl
+        # that did not finish are enqueued again by the next coordinator
+        (6, "crawl jobs by city", [
+            "DROP TABLE IF EXISTS crawl_jobs",
+            """
+            CREATE TABLE crawl_jobs (
+                source TEXT NOT NULL,
+                city TEXT NOT NULL,
+                dates TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, city)
+            )
+            """
+        ]),
+        # sources number their events independently, the hashes known so far take the source of their events
+        (7, "event hashes by source", [
+            """
+            CREATE TABLE events_hashes_by_source (
+                source_id INTEGER NOT NULL,
+                src_id INTEGER NOT NULL,
+                city_id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (source_id, src_id, city_id)
+            )
+            """,
+            """
+            INSERT OR IGNORE INTO events_hashes_by_source (source_id, src_id, city_id, hash)
+            SELECT e.source_id, h.src_id, h.city_id, h.hash
+            FROM events_hashes h
+            JOIN events e ON e.src_id = h.src_id AND e.city_id = h.city_id
+            WHERE e.source_id IS NOT NULL
+            """,
+            "DROP TABLE events_hashes",
+            "ALTER TABLE events_hashes_by_source RENAME TO events_hashes"
+        ]),
+        # the index keys its rows on the rowids of events, which a VACUUM may renumber unless they are an integer
+        # primary key, so events are rebuilt with one, the rowids are kept and the index is filled again in case
+        # they had been renumbered already, dropping events drops its triggers and indexes, they are made again
+        (8, "events by a stable rowid", [
+            """
+            CREATE TABLE events_by_rowid (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT UNIQUE,
+                src_id INTEGER,
+                title TEXT,
+                photo TEXT,
+                short_description TEXT,
+                description TEXT,
+                phone TEXT,
+                link TEXT,
+                location_id TEXT,
+                source_id INTEGER,
+                city_id TEXT,
+                ticket_url TEXT,
+                url TEXT,
+                category_id TEXT,
+                start REAL,
+                end REAL,
+                relevance TEXT,
+                start_day INTEGER GENERATED ALWAYS AS (CAST(start + 0.5 AS INTEGER)),
+                end_day INTEGER GENERATED ALWAYS AS (CAST(end + 0.5 AS INTEGER))
+            )
+            """,
+            """
+            INSERT INTO events_by_rowid (
+                rowid, id, src_id, title, photo, short_description, description, phone, link, location_id, source_id,
+                city_id, ticket_url, url, category_id, start, end, relevance
+            )
+            SELECT
+                rowid, id, src_id, title, photo, short_description, description, phone, link, location_id, source_id,
+                city_id, ticket_url, url, category_id, start, end, relevance
+            FROM events
+            """,
+            "DROP TABLE events",
+            "ALTER TABLE events_by_rowid RENAME TO events",
+            "CREATE INDEX events_src_id_city_id_start_end ON events (src_id, city_id, start, end)",
+            "CREATE INDEX events_start_day ON events (start_day, city_id, category_id)",
+            "CREATE INDEX events_end_day ON events (end_day)",
+            "CREATE INDEX events_category_id ON events (category_id)",
+            "DELETE FROM events_search",
+            """
+            INSERT INTO events_search (rowid, title, short_description, description, location, category)
+            SELECT
+                e.rowid,
+                replace(replace(e.title, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(e.short_description, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(e.description, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(l.name, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(c.name, 'ё', 'е'), 'Ё', 'Е')
+            FROM events e
+            LEFT JOIN locations l ON l.id = e.location_id
+            LEFT JOIN categories c ON c.id = e.category_id
+            """,
+            """
+            CREATE TRIGGER events_search_insert AFTER INSERT ON events BEGIN
+                INSERT INTO events_search (rowid, title, short_description, description, location, category)
+                SELECT
+                    NEW.rowid,
+                    replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.short_description, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.description, 'ё', 'е'), 'Ё', 'Е'),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM locations WHERE id = NEW.location_id),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM categories WHERE id = NEW.category_id);
+            END
+            """,
+            # an upsert updates every column, only events whose text changed are indexed again
+            """
+            CREATE TRIGGER events_search_update AFTER UPDATE ON events
+            WHEN OLD.title IS NOT NEW.title
+                OR OLD.short_description IS NOT NEW.short_description
+                OR OLD.description IS NOT NEW.description
+                OR OLD.location_id IS NOT NEW.location_id
+                OR OLD.category_id IS NOT NEW.category_id
+            BEGIN
+                DELETE FROM events_search WHERE rowid = OLD.rowid;
+                INSERT INTO events_search (rowid, title, short_description, description, location, category)
+                SELECT
+                    NEW.rowid,
+                    replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.short_description, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(NEW.description, 'ё', 'е'), 'Ё', 'Е'),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM locations WHERE id = NEW.location_id),
+                    (SELECT replace(replace(name, 'ё', 'е'), 'Ё', 'Е') FROM categories WHERE id = NEW.category_id);
+            END
+            """,
+            """
+            CREATE TRIGGER events_search_delete AFTER DELETE ON events BEGIN
+                DELETE FROM events_search WHERE rowid = OLD.rowid;
+            END
+            """
+        ])
+    ]
+
+    @staticmethod
+    def checksum(name: str, statements: list) -> str:
+        # whitespace is left out, so only a change to the sql itself counts
+        text = "\n".join([name] + [" ".join(statement.split()) for statement in statements])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    async def migrate(cls, connection: aiosqlite.Connection) -> list[int]:
+        # the parser workers and the backend may start together, the write lock lets one of them migrate at a time
+        await connection.execute("BEGIN IMMEDIATE")
+        try:
+            await connection.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at REAL NOT NULL,
+                    checksum TEXT
+                )
+            """)
+            cursor = await connection.execute("SELECT name FROM pragma_table_info('schema_migrations')")
+            if "checksum" not in [row[0] for row in await cursor.fetchall()]:
+                await connection.execute("ALTER TABLE schema_migrations ADD COLUMN checksum TEXT")
+
+            cursor = await connection.execute("SELECT version, checksum FROM schema_migrations")
+            checksums = dict(await cursor.fetchall())
+            current = max(checksums, default=0)
+
+            applied = list()
+            for version, name, statements in cls.VERSIONS:
+                checksum = cls.checksum(name=name, statements=statements)
+                if version <= current:
+                    # the parser and the backend each carry a copy of the versions, a copy that drifted from the one
+                    # that migrated the database would silently skip its own version of the schema
+                    if checksums.get(version) is None:
+                        await connection.execute(
+                            "UPDATE schema_migrations SET checksum = ? WHERE version = ?",
+                            (checksum, version)
+                        )
+                    elif checksums[version] != checksum:
+                        raise RuntimeError(
+                            f"Schema version {version} {name} differs from the one applied to the database, "
+                            f"helpers/migrations.py of the parser and the backend are out of sync"
+                        )
+                    continue
+
+                for statement in statements:
+                    await connection.execute(statement)
+                await connection.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at, checksum) VALUES (?, ?, ?, ?)",
+                    (version, name, time.time(), checksum)
+                )
+                applied.append(version)
+            await connection.commit()
+        except Exception:
+            await connection.rollback()
+            raise
+        return applied
@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import os
+from logging import Logger
+from typing import Awaitable, Callable
+
+import aiofiles
+
+from helpers.locks import FileLock
+
+
+class PhotoStorage:
+    INDEX = "index.json"
+
+    def __init__(self, directory: str, fetch: Callable[[str], Awaitable[bytes]], logger: Logger,
+                 concurrency: int):
+        self._directory = directory
+        self._fetch = fetch
+        self._logger = logger
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._index = dict()
+        self._pending = dict()
+        self._writing = dict()
+        self.Stats = dict(cached=0, downloaded=0, duplicates=0, failed=0, bytes_saved=0, bytes_downloaded=0)
+
+    def load(self):
+        os.makedirs(self._directory, exist_ok=True)
+        self._index = self.read_index()
+
+    def read_index(self) -> dict:
+        index_path = os.path.join(self._directory, self.INDEX)
+        if not os.path.exists(index_path):
+            return dict()
+        with open(index_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save_index(self):
+        index_path = os.path.join(self._directory, self.INDEX)
+        # workers share the directory, the index on disk may have gained their photos since it was loaded
+        with FileLock(path=f"{index_path}.lock"):
+            index = self.read_index()
+            index.update(self._index)
+            self._index = index
+
+            with open(f"{index_path}.{os.getpid()}.tmp", 'w', encoding='utf-8') as file:
+                json.dump(self._index, file)
+            os.replace(f"{index_path}.{os.getpid()}.tmp", index_path)
+
+    async def save(self, url: str) -> str | None:
+        if not url:
+            return None
+
+        file_path = self.get_cached(url=url)
+        if file_path is not None:
+            return file_path
+
+        task = self._pending.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self.download(url=url))
+            self._pending[url] = task
+            task.add_done_callback(lambda _: self._pending.pop(url, None))
+
+        return await task
+
+    def get_cached(self, url: str) -> str | None:
+        # photos saved before the index existed are named after the last url segment
+        for filename in (self._index.get(url), url.split("/")[-1]):
+            if not filename:
+                continue
+
+            file_path = os.path.join(self._directory, filename)
+            if os.path.exists(file_path):
+                self._index[url] = filename
+                self.Stats["cached"] += 1
+                self.Stats["bytes_saved"] += os.path.getsize(file_path)
+                return file_path
+
+        return None
+
+    async def download(self, url: str) -> str | None:
+        async with self._semaphore:
+            content = await self.fetch(url=url)
+        if content is None:
+            self.Stats["failed"] += 1
+            return None
+
+        self.Stats["downloaded"] += 1
+        self.Stats["bytes_downloaded"] += len(content)
+
+        extension = os.path.splitext(url.split("/")[-1])[1]
+        filename = f"{hashlib.sha256(content).hexdigest()}{extension}"
+        file_path = os.path.join(self._directory, filename)
+
+        # two urls of the same photo share one file, the second waits for the first to write it
+        task = self._writing.get(filename)
+        if task is not None or os.path.exists(file_path):
+            self.Stats["duplicates"] += 1
+        else:
+            task = asyncio.ensure_future(self.write(file_path=file_path, content=content))
+            self._writing[filename] = task
+            task.add_done_callback(lambda _: self._writing.pop(filename, None))
+        if task is not None:
+            await task
+
+        self._index[url] = filename
+        return file_path
+
+    @staticmethod
+    async def write(file_path: str, content: bytes):
+        async with aiofiles.open(f"{file_path}.{os.getpid()}.tmp", 'wb') as file:
+            await file.write(content)
+        os.replace(f"{file_path}.{os.getpid()}.tmp", file_path)
+
+    async def fetch(self, url: str) -> bytes | None:
+        # retries are left to the governor behind fetch
+        try:
+            return await self._fetch(url)
+        except Exception as e:
+            self._logger.error(f"Downloading photo {url} failed with error {e}")
+            return None
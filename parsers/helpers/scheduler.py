@@ -0,0 +1,23 @@
+import asyncio
+
+from helpers.governor import Governor
+
+
+class Scheduler:
+    def __init__(self, concurrency: int, governor: Governor):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._governor = governor
+
+    def slot(self, url: str):
+        # the host admits the request first, so requests queued for a busy host do not hold global slots
+        return self._governor.slot(url=url, semaphore=self._semaphore)
+
+    @staticmethod
+    async def gather(coroutines: list, limit: int) -> list:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*[run(coroutine) for coroutine in coroutines], return_exceptions=True)
@@ -1,12 +1,22 @@
+# the containers map a row to itself, models hash by their natural key, so every key is buffered once,
+# in the order it was first added, and the last row put for it is the one written
 class Storage:
     def __init__(self):
-            self.Categories = set()
-            self.Cities = set()
-            self.Events = set()
-            self.Locations = set()
+            self.Categories = dict()
+            self.Cities = dict()
+            self.Events = dict()
+            self.Locations = dict()
+            self.Hashes = dict()
+            self.CrawlEvents = dict()
+            self.CrawlDates = dict()
+            self.CrawlJobs = dict()
 
     def clear(self):
         self.Categories.clear()
         self.Cities.clear()
         self.Events.clear()
         self.Locations.clear()
+        self.Hashes.clear()
+        self.CrawlEvents.clear()
+        self.CrawlDates.clear()
+        self.CrawlJobs.clear()
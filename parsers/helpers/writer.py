@@ -0,0 +1,180 @@
+import asyncio
+import sqlite3
+from logging import Logger
+
+from helpers.database import Database
+from helpers.metrics import Metrics
+from helpers.storage import Storage
+from models.table_configurations import TableConfiguration
+from models.table_configurations.db_table import DbTable
+
+
+class Writer:
+    def __init__(self, db: Database, tables: TableConfiguration, logger: Logger,
+                 queue_size: int, batch_rows: int, batch_bytes: int, interval: float, metrics: Metrics = None):
+        self._db = db
+        self._metrics = metrics or Metrics()
+        self._logger = logger
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._batch_rows = batch_rows
+        self._batch_bytes = batch_bytes
+        self._interval = interval
+        self._storage = Storage()
+        # tables are written in this order inside one transaction, hashes and crawl progress only after their events,
+        # categories and locations before them, the search index of an event takes their names when it is written
+        self._tables = [
+            (tables.CATEGORIES, self._storage.Categories),
+            (tables.CITIES, self._storage.Cities),
+            (tables.LOCATIONS, self._storage.Locations),
+            (tables.EVENTS, self._storage.Events),
+            (tables.EVENTS_HASHES, self._storage.Hashes),
+            (tables.CRAWL_EVENTS, self._storage.CrawlEvents),
+            (tables.CRAWL_DATES, self._storage.CrawlDates),
+            (tables.CRAWL_JOBS, self._storage.CrawlJobs),
+        ]
+        self._buffers = {table.NAME: items for table, items in self._tables}
+        self._rows = 0
+        self._bytes = 0
+        self._deadline = None
+        self._task = None
+        self.Stats = dict(flushes=0, rows=0, failed=0)
+
+    async def start(self):
+        await self._db.connect()
+        self._task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self._task is None:
+            return
+
+        try:
+            await self.enqueue(entry=None)
+            await self._task
+        finally:
+            self._task = None
+            await self._db.disconnect()
+
+    async def put(self, table: DbTable, item):
+        # waits while the queue is full, which holds the crawl back until the database catches up
+        await self.enqueue(entry=(table, item))
+
+    async def sync(self):
+        # waits until everything put so far is committed
+        done = asyncio.get_running_loop().create_future()
+        await self.enqueue(entry=done)
+        await asyncio.wait([done, self._task], return_when=asyncio.FIRST_COMPLETED)
+        if not done.done():
+            raise self.stopped()
+
+    async def enqueue(self, entry):
+        # the task only ends on close, anything put after it died would wait for it forever
+        if self._task is None or self._task.done():
+            raise self.stopped()
+        if not self._queue.full():
+            self._queue.put_nowait(entry)
+            return
+
+        put = asyncio.ensure_future(self._queue.put(entry))
+        await asyncio.wait([put, self._task], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            raise self.stopped()
+
+    def stopped(self) -> Exception:
+        if self._task is None:
+            return RuntimeError("Writer is not running")
+        error = self._task.exception() if not self._task.cancelled() else "cancelled"
+        return RuntimeError(f"Writer stopped with error {error}")
+
+    async def run(self):
+        while True:
+            try:
+                # buffered rows wait at most interval seconds, even while new ones keep coming
+                timeout = max(self._deadline - asyncio.get_running_loop().time(), 0) if self._deadline is not None else None
+                entry = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                await self.flush()
+                continue
+
+            if entry is None:
+                await self.flush()
+                return
+
+            if isinstance(entry, asyncio.Future):
+                await self.flush()
+                entry.set_result(None)
+                continue
+
+            table, item = entry
+            try:
+                size = self.estimate(table=table, item=item)
+            except Exception as e:
+                # a row that cannot be built is dropped on its own, the writer keeps serving the rest
+                self.Stats["failed"] += 1
+                self._logger.error(f"Buffering a row of {table.NAME} failed with error {e}")
+                continue
+
+            if self._deadline is None:
+                self._deadline = asyncio.get_running_loop().time() + self._interval
+            # a row with the same key replaces the buffered one, so it is written once with its latest values
+            buffer = self._buffers[table.NAME]
+            if item not in buffer:
+                self._rows += 1
+            buffer[item] = item
+            self._bytes += size
+
+            if self._rows >= self._batch_rows or self._bytes >= self._batch_bytes or self.expired():
+                await self.flush()
+
+    async def flush(self):
+        if self._rows == 0:
+            return
+
+        try:
+            batches = [
+                (table, [self.to_row(table=table, item=item) for item in items.values()])
+                for table, items in self._tables
+                if len(items) > 0
+            ]
+            with self._metrics.measure(stage="write") as sample:
+                sample.bytes = self._bytes
+                failed = await self.write(batches=batches)
+            self.Stats["flushes"] += 1
+            self.Stats["rows"] += self._rows - failed
+            self.Stats["failed"] += failed
+        except Exception as e:
+            self.Stats["failed"] += self._rows
+            self._logger.error(f"Writing {self._rows} rows failed with error {e}")
+
+        self._storage.clear()
+        self._rows = 0
+        self._bytes = 0
+        self._deadline = None
+
+    async def write(self, batches: list) -> int:
+        try:
+            await self._db.write(batches=batches)
+            return 0
+        except sqlite3.IntegrityError as e:
+            # a bad row rolls back the whole transaction, the tables and then their rows are written apart, so it
+            # does not take the other rows and the crawl progress down with it
+            if len(batches) > 1:
+                return sum([await self.write(batches=[batch]) for batch in batches])
+
+            table, rows = batches[0]
+            if len(rows) > 1:
+                return sum([await self.write(batches=[(table, [row])]) for row in rows])
+
+            self._logger.error(f"Writing a row of {table.NAME} failed with error {e}")
+            return 1
+
+    def expired(self) -> bool:
+        return self._deadline is not None and asyncio.get_running_loop().time() >= self._deadline
+
+    @staticmethod
+    def to_row(table: DbTable, item) -> tuple:
+        return item if isinstance(item, tuple) else table.ROW(item)
+
+    @staticmethod
+    def estimate(table: DbTable, item) -> int:
+        return sum(len(value) if isinstance(value, str) else 8 for value in Writer.to_row(table=table, item=item))
@@ -1,34 +1,34 @@
+import argparse
+import contextlib
 import json
 import asyncio
 import logging.config
+import os
+import socket
+import sys
 import traceback
 import aiohttp
-import time
 
-from helpers import Database
+from helpers import Database, Profiler
 from models.Sources import Sources
 from models.table_configurations import TableConfiguration
-from parsers import SxodimParser
+from parsers import Crawler, PARSERS
 
 config: dict
 logger: logging.Logger
 session: aiohttp.ClientSession
 
 
-def timer(func):
-    async def wrapper(*args, **kwargs):
-        start = time.time()
-        value = await func(*args, **kwargs)
-        print(f"Function {func.__name__} end up in: {time.time() - start} seconds")
-        return value
-
-    return wrapper
-
-
-@timer
 async def main():
     global config, logger, session
 
+    arguments = argparse.ArgumentParser(description="Crawl events into the database")
+    arguments.add_argument("--resume", action="store_true", help="continue the last crawl that did not finish")
+    arguments.add_argument("--workers", type=int, default=0, help="enqueue jobs and crawl them with this many processes")
+    arguments.add_argument("--worker", action="store_true", help="crawl jobs enqueued by a coordinator")
+    arguments.add_argument("--profile", action="store_true", help="write cProfile and tracemalloc reports of the run")
+    args = arguments.parse_args()
+
     with open("config.json", 'r', encoding='utf-8') as file:
         config = json.load(file)
 
@@ -41,33 +41,83 @@ async def main():
     tables = TableConfiguration()
 
     db = Database(config=config, tables=tables)
+    migrations = await db.migrate()
+    if migrations:
+        logger.info(f"Applied schema migrations {migrations}")
 
     await db.insert(
         table=tables.SOURCES.NAME,
         columns=tables.SOURCES.COLUMNS,
         data=[
-            [source.__dict__.get(col) for col in tables.SOURCES.COLUMNS]
+            tables.SOURCES.ROW(source)
             for source in Sources().value.values()
         ]
     )
 
-    sxodim_parser = SxodimParser(
+    crawler = Crawler(
         config=config,
         logger=logger,
         db=db,
         session=session,
-        tables=tables
+        tables=tables,
+        parsers=[PARSERS[source] for source in config["sources"]],
+        resume=args.resume
     )
 
+    profiler = Profiler(
+        directory=config["profiling"]["directory"],
+        top=config["profiling"]["top"],
+        frames=config["profiling"]["frames"]
+    ) if args.profile else None
+
     try:
         logger.info(f"Parser started")
-        await sxodim_parser.parse()
+        if args.worker:
+            with profiler.profile(name="worker") if profiler else contextlib.nullcontext():
+                await crawler.work(worker=f"{socket.gethostname()}-{os.getpid()}")
+        elif args.workers > 0:
+            with profiler.profile(name="coordinate") if profiler else contextlib.nullcontext():
+                await crawler.coordinate()
+            await run_workers(db=db, count=args.workers, profile=args.profile)
+        else:
+            with profiler.profile(name="parse") if profiler else contextlib.nullcontext():
+                await crawler.parse()
     except Exception as err:
         logger.fatal(f"Parser failed with error {err}\nTRACEBACK: {traceback.format_exc()}")
+        # the supervisor only starts another worker when this one exits with an error
+        if args.worker:
+            sys.exit(1)
     finally:
         await close_connections()
 
 
+async def run_workers(db: Database, count: int, profile: bool):
+    restarts = dict(left=config["jobs"]["restarts"])
+    await asyncio.gather(*[supervise_worker(db=db, restarts=restarts, profile=profile) for _ in range(count)])
+
+    jobs = await db.count_jobs()
+    logger.info(f"Workers finished, jobs: {', '.join(f'{count} {status}' for status, count in sorted(jobs.items()))}")
+
+
+async def supervise_worker(db: Database, restarts: dict, profile: bool):
+    # each worker profiles itself into the same directory
+    arguments = ["--worker", "--profile"] if profile else ["--worker"]
+    while True:
+        process = await asyncio.create_subprocess_exec(sys.executable, sys.argv[0], *arguments)
+        code = await process.wait()
+        if code == 0:
+            return
+
+        # the leases of a dead worker expire and its jobs go to the others, a replacement keeps the pool size
+        jobs = await db.count_jobs()
+        if restarts["left"] == 0 or jobs.get("pending", 0) + jobs.get("leased", 0) == 0:
+            logger.error(f"Worker {process.pid} exited with code {code}")
+            return
+
+        restarts["left"] -= 1
+        logger.warning(f"Worker {process.pid} exited with code {code}, starting another one")
+
+
 async def close_connections():
     await session.close()
 
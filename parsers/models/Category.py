@@ -1,4 +1,10 @@
-class Category:
+from .Record import Record
+
+
+class Category(Record):
+    __slots__ = ("id", "name")
+    KEY = ("name",)
+
     def __init__(self, id, name):
         self.id = id
-        self.name = name
\ No newline at end of file
+        self.name = name
@@ -1,4 +1,10 @@
-class City:
+from .Record import Record
+
+
+class City(Record):
+    __slots__ = ("id", "name", "slug")
+    KEY = ("name",)
+
     def __init__(self, id, name, slug):
         self.id = id
         self.name = name
@@ -0,0 +1,13 @@
+from .Record import Record
+
+
+class CrawlDate(Record):
+    __slots__ = ("source", "city", "date", "page", "done")
+    KEY = ("source", "city", "date")
+
+    def __init__(self, source, city, date, page, done):
+        self.source = source
+        self.city = city
+        self.date = date
+        self.page = page
+        self.done = done
@@ -0,0 +1,13 @@
+from .Record import Record
+
+
+class CrawlEvent(Record):
+    __slots__ = ("source", "city", "slug", "event", "processed")
+    KEY = ("source", "city", "slug")
+
+    def __init__(self, source, city, slug, event, processed):
+        self.source = source
+        self.city = city
+        self.slug = slug
+        self.event = event
+        self.processed = processed
@@ -0,0 +1,15 @@
+from .Record import Record
+
+
+class CrawlJob(Record):
+    __slots__ = ("source", "city", "dates", "status", "worker", "lease_until", "attempts")
+    KEY = ("source", "city")
+
+    def __init__(self, source, city, dates, status, worker, lease_until, attempts):
+        self.source = source
+        self.city = city
+        self.dates = dates
+        self.status = status
+        self.worker = worker
+        self.lease_until = lease_until
+        self.attempts = attempts
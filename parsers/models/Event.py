@@ -1,7 +1,15 @@
 import datetime
 
+from .Record import Record
+
+
+class Event(Record):
+    __slots__ = (
+        "id", "src_id", "title", "photo", "short_description", "description", "phone", "link", "location_id",
+        "source_id", "city_id", "ticket_url", "url", "category_id", "start", "end", "relevance"
+    )
+    KEY = ("source_id", "src_id", "city_id")
 
-class Event:
     def __init__(
         self,
         id,
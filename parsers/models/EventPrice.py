@@ -1,8 +1,16 @@
-class EventPrice:
-    def __init__(self, id, event_id, date, price, seat, available):
+from .Record import Record
+
+
+class EventPrice(Record):
+    __slots__ = ("id", "event_id", "date", "price", "row", "column", "sector", "available")
+    KEY = ("event_id", "date", "price", "row", "column", "sector")
+
+    def __init__(self, id, event_id, date, price, row, column, sector, available):
         self.id = id
         self.event_id = event_id
         self.date = date
         self.price = price
-        self.seat = seat
+        self.row = row
+        self.column = column
+        self.sector = sector
         self.available = available
@@ -1,7 +1,10 @@
-import math
+from .Record import Record
 
 
-class Location:
+class Location(Record):
+    __slots__ = ("id", "name")
+    KEY = ("name",)
+
     def __init__(self, id, name):
         self.id = id
-        self.name = name
\ No newline at end of file
+        self.name = name
@@ -1,4 +1,10 @@
-class Source:
+from .Record import Record
+
+
+class Source(Record):
+    __slots__ = ("id", "name", "slug")
+    KEY = ("slug",)
+
     def __init__(self, id, name, slug):
         self.id = id
         self.name = name
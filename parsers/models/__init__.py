@@ -4,3 +4,7 @@ from .Event import Event
 from .Source import Source
 from .Location import Location
 from .EventPrice import EventPrice
+
+from .CrawlDate import CrawlDate
+from .CrawlEvent import CrawlEvent
+from .CrawlJob import CrawlJob
\ No newline at end of file
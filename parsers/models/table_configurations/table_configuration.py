@@ -46,8 +46,36 @@ class TableConfiguration:
             primary_key="id"
         )
 
+        self.EVENTS_HASHES = DbTable(
+            table="events_hashes",
+            columns=["source_id", "src_id", "city_id", "hash"],
+            on_conflict="on conflict (source_id, src_id, city_id) do update set hash = EXCLUDED.hash"
+        )
+
+        self.CRAWL_DATES = DbTable(
+            table="crawl_dates",
+            columns=["source", "city", "date", "page", "done"],
+            on_conflict="on conflict (source, city, date) do update set page = EXCLUDED.page, done = EXCLUDED.done"
+        )
+
+        self.CRAWL_EVENTS = DbTable(
+            table="crawl_events",
+            columns=["source", "city", "slug", "event", "processed"],
+            on_conflict="on conflict (source, city, slug) do update set event = EXCLUDED.event, "
+                        "processed = EXCLUDED.processed"
+        )
+
+        # a job is only marked done by the worker that still holds its lease, another one may have taken it over
+        self.CRAWL_JOBS = DbTable(
+            table="crawl_jobs",
+            columns=["source", "city", "dates", "status", "worker", "lease_until", "attempts"],
+            on_conflict="on conflict (source, city) do update set status = EXCLUDED.status, "
+                        "worker = EXCLUDED.worker, lease_until = EXCLUDED.lease_until "
+                        "where crawl_jobs.worker = EXCLUDED.worker and crawl_jobs.status = 'leased'"
+        )
+
         self.EVENTS_PRICES = DbTable(
             table="events_prices",
-            columns=["id", "event_id", "date_id", "price", "seat_id"],
-            on_conflict=f"on conflict (event_id, date, price, seat) do update set available = EXCLUDED.available"
+            columns=["id", "event_id", "date", "price", "row", "column", "sector", "available"],
+            on_conflict=f"on conflict (event_id, date, price, row, column, sector) do update set available = EXCLUDED.available"
         )
@@ -1 +1,7 @@
-from .sxodim_parser import SxodimParser
\ No newline at end of file
+from .base_parser import BaseParser
+from .sxodim_parser import SxodimParser
+from .sxodim_extractor import SxodimExtractor
+from .crawler import Crawler
+
+# source plugins by the key config["sources"] enables them with
+PARSERS = {parser.SOURCE: parser for parser in (SxodimParser,)}
@@ -0,0 +1,79 @@
+import uuid
+from abc import ABC, abstractmethod
+from logging import Logger
+
+from helpers import Database, ForeignKeyMapper, Scheduler, PhotoStorage, Metrics
+from models.table_configurations import TableConfiguration
+from models.table_configurations.db_table import DbTable
+
+
+# a source plugin discovers its cities and dates, then crawls them, the crawler it runs in fetches, extracts in
+# the worker processes and persists for it, so every source shares one concurrency budget and one writer
+class BaseParser(ABC):
+    # the key of the source in Sources, its crawl progress and jobs are kept under it
+    SOURCE = None
+    # ids of new rows are derived from their natural keys, so parallel workers write the same rows, a source that
+    # does not set its own namespace gets one of its key
+    NAMESPACE = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.NAMESPACE is None and cls.SOURCE is not None:
+            cls.NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, f"source:{cls.SOURCE}")
+
+    def __init__(self, config: dict, logger: Logger, db: Database, tables: TableConfiguration,
+                 mapper: ForeignKeyMapper, scheduler: Scheduler, photos: PhotoStorage, metrics: Metrics,
+                 crawler, resume: bool = False):
+        self._config = config
+        self._logger = logger
+        self._db = db
+        self._tables = tables
+        self._mapper = mapper
+        self._scheduler = scheduler
+        self._photos = photos
+        self._metrics = metrics
+        self._crawler = crawler
+        self._resume = resume
+        self._complete = True
+
+    @property
+    def complete(self) -> bool:
+        return self._complete
+
+    @property
+    def source_id(self) -> int | None:
+        source = self._mapper.Sources.value.get(self.SOURCE)
+        return source.id if source is not None else None
+
+    def make_id(self, *parts) -> str:
+        return str(uuid.uuid5(self.NAMESPACE, ":".join(str(part) for part in parts)))
+
+    @abstractmethod
+    async def discover(self) -> dict[str, list]:
+        # the dates to crawl in every city of the source
+        pass
+
+    @abstractmethod
+    async def crawl(self, city: str, dates: list, checkpoint: bool):
+        pass
+
+    async def crawl_job(self, city: str, dates: list) -> bool:
+        self._complete = True
+        await self.crawl(city=city, dates=dates, checkpoint=False)
+        return self._complete
+
+    def report(self):
+        pass
+
+    async def fetch(self, url: str, stage: str, cache: bool = False) -> bytes:
+        with self._metrics.measure(stage=stage) as sample:
+            content, network = await self._crawler.fetch(url=url, cache=cache)
+            # the bandwidth of a stage is what was transferred, not what was served from the cache
+            sample.bytes = len(content) if network else 0
+        return content
+
+    async def extract(self, url: str, content: bytes, function) -> dict:
+        return await self._crawler.extract(url=url, content=content, function=function)
+
+    async def persist(self, table: DbTable, item):
+        await self._crawler.persist(table=table, item=item)
@@ -0,0 +1,405 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from logging import Logger
+
+import aiohttp
+
+from helpers import Database, ForeignKeyMapper, Scheduler, Governor, ResponseError
+from helpers import PhotoStorage, HttpCache, Writer, Recorder, Metrics
+from models import CrawlJob
+from models.table_configurations import TableConfiguration
+from models.table_configurations.db_table import DbTable
+from parsers.base_parser import BaseParser
+
+
+class Crawler:
+    def __init__(self, config: dict, logger: Logger, db: Database, tables: TableConfiguration,
+                 session: aiohttp.ClientSession, parsers: list[type[BaseParser]], resume: bool = False):
+        self._db = db
+        self._config = config
+        self._logger = logger
+        self._session = session
+        self._tables = tables
+        self._metrics = Metrics()
+        self._summary = config["metrics"]["summary"]
+        self._serve = config["metrics"]["port"] is not None
+        self._writer = Writer(
+            db=db,
+            tables=tables,
+            logger=logger,
+            queue_size=config["writer"]["queue"],
+            batch_rows=config["writer"]["rows"],
+            batch_bytes=config["writer"]["bytes"],
+            interval=config["writer"]["interval"],
+            metrics=self._metrics
+        )
+        self._mapper = ForeignKeyMapper(
+            db=db,
+            tables=tables,
+            lazy=config["mapper"]["lazy"],
+            cache_size=config["mapper"]["cache_size"],
+            batch=config["mapper"]["batch"]
+        )
+        self._photos = PhotoStorage(
+            directory=config["files"],
+            fetch=self.fetch_photo,
+            logger=logger,
+            concurrency=config["photos"]["concurrency"]
+        )
+        self._cache = HttpCache(
+            directory=config["http_cache"]["directory"],
+            max_size=config["http_cache"]["max_size"]
+        ) if config["http_cache"]["enabled"] else None
+        self._recorder = Recorder(directory=config["fixtures"]["record"]) if config["fixtures"]["record"] else None
+        self._replay = config["fixtures"]["replay"]
+        self._pool = None
+        self._streaming = False
+        self._resume = resume
+        self._complete = True
+        self._governor = Governor(
+            logger=logger,
+            rate=config["governor"]["rate"],
+            min_rate=config["governor"]["min_rate"],
+            max_rate=config["governor"]["max_rate"],
+            burst=config["governor"]["burst"],
+            concurrency=config["governor"]["concurrency"],
+            min_concurrency=config["governor"]["min_concurrency"],
+            max_concurrency=config["governor"]["max_concurrency"],
+            latency=config["governor"]["latency"],
+            increase=config["governor"]["increase"],
+            decrease=config["governor"]["decrease"],
+            attempts=config["governor"]["attempts"],
+            budget=config["governor"]["budget"],
+            reserve=config["governor"]["reserve"],
+            backoff=config["governor"]["backoff"]
+        )
+        # one budget of requests in flight for all sources, the governor still limits every host on its own
+        self._scheduler = Scheduler(concurrency=config["scheduler"]["concurrency"], governor=self._governor)
+        self._parsers = {
+            parser.SOURCE: parser(
+                config=config,
+                logger=logger,
+                db=db,
+                tables=tables,
+                mapper=self._mapper,
+                scheduler=self._scheduler,
+                photos=self._photos,
+                metrics=self._metrics,
+                crawler=self,
+                resume=resume
+            )
+            for parser in parsers
+        }
+
+    async def parse(self):
+        await self.run(task=self.crawl())
+
+        # a finished crawl leaves nothing to resume, the next run starts from the first city again
+        complete = self._complete and all(parser.complete for parser in self._parsers.values())
+        if complete and self._writer.Stats["failed"] == 0:
+            await self._db.clear_checkpoints()
+
+    async def coordinate(self):
+        # the coordinator only discovers, it extracts no pages and writes just the cities it finds
+        await self.run(task=self.enqueue_jobs(), streaming=False)
+
+    async def work(self, worker: str):
+        # every worker keeps its own summary, the metrics endpoint is left to the coordinator
+        self._serve = False
+        if self._summary:
+            root, extension = os.path.splitext(self._summary)
+            self._summary = f"{root}.{worker}{extension}"
+        await self.run(task=self.work_jobs(worker=worker))
+
+    async def run(self, task, streaming: bool = True):
+        processes = self._config["extraction"]["processes"]
+        self._pool = ProcessPoolExecutor(max_workers=processes) if streaming and processes > 0 else None
+        self._streaming = streaming
+        if self._serve:
+            await self._metrics.serve(host=self._config["metrics"]["host"], port=self._config["metrics"]["port"])
+        if streaming:
+            await self._writer.start()
+        try:
+            await task
+        finally:
+            await self._writer.close()
+            if self._pool is not None:
+                self._pool.shutdown()
+            await self._metrics.close()
+
+        if streaming:
+            self._logger.info(
+                f"Writer: {self._writer.Stats['rows']} rows in {self._writer.Stats['flushes']} transactions, "
+                f"{self._writer.Stats['failed']} rows failed"
+            )
+        self._logger.info(f"Metrics: {json.dumps(self._metrics.summary())}")
+        if self._summary:
+            self._metrics.save(path=self._summary)
+
+    async def prepare(self):
+        await self._mapper.fill_all()
+        self._photos.load()
+        if self._cache is not None:
+            self._cache.load()
+        if self._recorder is not None:
+            self._recorder.load()
+
+    async def finish(self):
+        self._photos.save_index()
+        if self._cache is not None:
+            self._cache.save()
+
+        for parser in self._parsers.values():
+            parser.report()
+        self._logger.info(
+            f"Photos: {self._photos.Stats['cached']} cached, {self._photos.Stats['downloaded']} downloaded, "
+            f"{self._photos.Stats['duplicates']} duplicates, {self._photos.Stats['failed']} failed, "
+            f"{self._photos.Stats['bytes_saved']} bytes saved"
+        )
+        for host, metrics in self._governor.metrics().items():
+            self._logger.info(
+                f"Governor {host}: {metrics['rate']} requests/sec, concurrency {metrics['concurrency']}, "
+                f"{metrics['requests']} requests, {metrics['retries']} retries, {metrics['throttled']} throttled, "
+                f"{metrics['errors']} errors, {metrics['slow']} slow, {metrics['budget_exhausted']} out of retry budget"
+            )
+        if self._cache is not None:
+            self._logger.info(
+                f"HTTP cache: {self._cache.Stats['hits']} hits, {self._cache.Stats['misses']} misses, "
+                f"{self._cache.Stats['evictions']} evictions, {self._cache.size} bytes stored"
+            )
+
+    async def crawl(self):
+        await self.prepare()
+        if not self._resume:
+            await self._db.clear_checkpoints()
+
+        # sources run side by side, the crawl takes as long as the slowest of them
+        await asyncio.gather(*[self.crawl_source(parser=parser) for parser in self._parsers.values()])
+        await self.finish()
+
+    async def crawl_source(self, parser: BaseParser):
+        try:
+            cities = await parser.discover()
+        except Exception as e:
+            self._complete = False
+            self._logger.error(f"Discovering {parser.SOURCE} failed with error {e}")
+            return
+
+        results = await asyncio.gather(
+            *[parser.crawl(city=city, dates=dates, checkpoint=True) for city, dates in cities.items()],
+            return_exceptions=True
+        )
+        for city, result in zip(cities, results):
+            if isinstance(result, Exception):
+                self._complete = False
+                self._logger.error(f"Parsing {parser.SOURCE} city {city} failed with error {result}")
+
+    async def enqueue_jobs(self):
+        await self.prepare()
+
+        results = await asyncio.gather(
+            *[parser.discover() for parser in self._parsers.values()],
+            return_exceptions=True
+        )
+
+        jobs = list()
+        for parser, result in zip(self._parsers.values(), results):
+            if isinstance(result, Exception):
+                self._logger.error(f"Discovering {parser.SOURCE} failed with error {result}")
+                continue
+            jobs += [(parser.SOURCE, city, json.dumps(dates)) for city, dates in result.items()]
+            self._logger.info(f"Discovered {len(result)} cities of {parser.SOURCE}")
+
+        # a resumed run keeps the cities that are done and only adds the new ones
+        await self._db.enqueue_jobs(jobs=jobs, reset=not self._resume)
+        self._logger.info(f"Enqueued {len(jobs)} jobs")
+        await self.finish()
+
+    async def work_jobs(self, worker: str):
+        await self.prepare()
+
+        while True:
+            row = await self._db.claim_job(
+                worker=worker,
+                lease=self._config["jobs"]["lease"],
+                attempts=self._config["jobs"]["attempts"]
+            )
+            if row is None:
+                # the last jobs of this worker are marked done only once the writer commits them
+                await self._writer.sync()
+                jobs = await self._db.count_jobs()
+                if jobs.get("pending", 0) + jobs.get("leased", 0) == 0:
+                    break
+
+                # the rest is leased by other workers, wait for them to finish or for their leases to expire
+                await asyncio.sleep(self._config["jobs"]["poll"])
+                continue
+
+            job = CrawlJob(
+                source=row[0],
+                city=row[1],
+                dates=row[2],
+                status=row[3],
+                worker=row[4],
+                lease_until=row[5],
+                attempts=row[6]
+            )
+            await self.parse_job(worker=worker, job=job)
+
+        await self.finish()
+
+    async def parse_job(self, worker: str, job: CrawlJob):
+        self._logger.info(
+            f"Worker {worker} took job source: {job.source} city: {job.city} attempt: {job.attempts}"
+        )
+        parser = self._parsers.get(job.source)
+        complete = False
+        if parser is None:
+            self._logger.error(f"Job source: {job.source} is not enabled in this worker")
+        else:
+            crawl = asyncio.ensure_future(parser.crawl_job(city=job.city, dates=json.loads(job.dates)))
+            heartbeat = asyncio.ensure_future(self.keep_lease(worker=worker, job=job))
+            try:
+                await asyncio.wait([crawl, heartbeat], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                heartbeat.cancel()
+
+            if not crawl.done():
+                # the job may belong to another worker by now, it is neither released nor marked done from here
+                crawl.cancel()
+                await asyncio.wait([crawl])
+                self._logger.warning(f"Worker {worker} lost the lease of city: {job.city}, stopped the job")
+                return
+            try:
+                complete = crawl.result()
+            except Exception as e:
+                self._logger.error(f"Job source: {job.source} city: {job.city} failed with error {e}")
+
+        if not complete:
+            await self._db.release_job(
+                source=job.source,
+                city=job.city,
+                worker=worker,
+                attempts=self._config["jobs"]["attempts"]
+            )
+            return
+
+        # the job is marked done in the same transaction as the last of its rows
+        await self._writer.put(
+            table=self._tables.CRAWL_JOBS,
+            item=CrawlJob(
+                source=job.source,
+                city=job.city,
+                dates=job.dates,
+                status="done",
+                worker=worker,
+                lease_until=None,
+                attempts=job.attempts
+            )
+        )
+
+    async def keep_lease(self, worker: str, job: CrawlJob):
+        lease = self._config["jobs"]["lease"]
+        while True:
+            await asyncio.sleep(lease / 3)
+            try:
+                extended = await self._db.extend_lease(
+                    source=job.source,
+                    city=job.city,
+                    worker=worker,
+                    lease=lease
+                )
+            except Exception as e:
+                # the lease still runs for a while, the next beat tries again
+                self._logger.warning(f"Extending the lease of city: {job.city} failed with error {e}")
+                continue
+            if not extended:
+                return
+
+    async def persist(self, table: DbTable, item):
+        if not self._streaming:
+            await self._db.insert(
+                table=table.NAME,
+                columns=table.COLUMNS,
+                data=[Writer.to_row(table=table, item=item)],
+                on_conflict=table.ON_CONFLICT
+            )
+            return
+        await self._writer.put(table=table, item=item)
+
+    async def extract(self, url: str, content: bytes, function) -> dict:
+        fields = self._cache.get_data(url=url) if self._cache is not None else None
+        if fields is None:
+            # the page is parsed in a worker process, so the event loop keeps fetching meanwhile
+            with self._metrics.measure(stage="parse") as sample:
+                sample.bytes = len(content)
+                fields = await asyncio.get_running_loop().run_in_executor(self._pool, function, content)
+            if self._cache is not None:
+                self._cache.set_data(url=url, data=fields)
+        return fields
+
+    async def fetch(self, url: str, cache: bool = False) -> tuple[bytes, bool]:
+        # the body and whether it came over the network, a body read from the cache after a 304 did not
+        return await self._governor.call(url=url, request=lambda: self.request(url=url, cache=cache))
+
+    async def fetch_photo(self, url: str) -> bytes:
+        with self._metrics.measure(stage="photo") as sample:
+            content, _ = await self.fetch(url=url)
+            sample.bytes = len(content)
+        return content
+
+    async def request(self, url: str, cache: bool = False) -> tuple[bytes, bool]:
+        cache = self._cache if cache else None
+        headers = cache.get_headers(url=url) if cache is not None else None
+
+        async with self._scheduler.slot(url=url):
+            async with self._session.get(url=self.get_request_url(url=url), headers=headers) as response:
+                if response.status == 304 and cache is not None:
+                    content = await cache.read(url=url)
+                    if content is not None:
+                        await self.record(
+                            url=url,
+                            status=200,
+                            content_type=cache.get_content_type(url=url),
+                            content=content
+                        )
+                        return content, False
+                elif response.status != 200:
+                    await self.record(url=url, status=response.status, content_type=None, content=b"")
+                    raise ResponseError(status=response.status, retry_after=response.headers.get("Retry-After"))
+                else:
+                    content = await response.read()
+                    await self.record(url=url, status=200, content_type=response.content_type, content=content)
+                    if cache is not None:
+                        await cache.store(
+                            url=url,
+                            content=content,
+                            content_type=response.content_type,
+                            etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified")
+                        )
+                    return content, True
+
+        # the cached body is gone, ask again without validators
+        if self._cache is not None:
+            self._cache.discard(url=url)
+        return await self.request(url=url, cache=True)
+
+    def get_request_url(self, url: str) -> str:
+        # urls keep pointing at the original hosts, only the replay server is asked instead
+        if self._replay:
+            return Recorder.rewrite(url=url, replay=self._replay)
+        return url
+
+    async def record(self, url: str, status: int, content_type: str | None, content: bytes):
+        if self._recorder is not None:
+            await self._recorder.record(
+                method="GET",
+                url=url,
+                status=status,
+                content_type=content_type,
+                content=content
+            )
@@ -0,0 +1,234 @@
+from lxml import etree
+
+
+def has_class(name: str) -> str:
+    # the plain substring test is cheap and rejects most elements before the exact token test
+    return f"contains(@class, '{name}') and contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# lxml counterpart of the BeautifulSoup getters in SxodimParser, the output is kept identical
+class SxodimExtractor:
+    DESCRIPTION = etree.XPath(f"//*[{has_class('content_wrapper')}]/p")
+    IMAGES = etree.XPath("descendant::img")
+    LOCATION_ICON = etree.XPath(f"(//*[{has_class('svg-icon--location')}])[1]")
+    LOCATION_TEXT = etree.XPath(f"(descendant::* | following::*)[{has_class('text')}][1]")
+    PHONE = etree.XPath(f"(//*[{has_class('group')}]/div[{has_class('number')}])[1]")
+    BUY_URL = etree.XPath(f"(//*[{has_class('buy-ticket')}]/a)[1]")
+    LINK = etree.XPath(f"(//*[{has_class('more_info')}]/*[{has_class('group')}]/*[{has_class('text')}]/a)[1]")
+
+    # tree building rules of BeautifulSoup's html builder, so the serialized markup is the same
+    VOID_ELEMENTS = {
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param',
+        'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+    }
+    PRESERVE_WHITESPACE = {'pre', 'textarea'}
+    ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+    CDATA_CONTAINERS = {'script', 'style'}
+    STRING_CONTAINERS = {'script', 'style', 'template', 'rt', 'rp'}
+    LIST_ATTRIBUTES = {
+        "*": {'class', 'accesskey', 'dropzone'},
+        "a": {'rel', 'rev'},
+        "link": {'rel', 'rev'},
+        "td": {"headers"},
+        "th": {"headers"},
+        "form": {"accept-charset"},
+        "object": {"archive"},
+        "area": {"rel"},
+        "icon": {"sizes"},
+        "iframe": {"sandbox"},
+        "output": {"for"}
+    }
+    # libxml2 fills a minimized boolean attribute with its own name, BeautifulSoup leaves it empty
+    BOOLEAN_ATTRIBUTES = {
+        'checked', 'compact', 'declare', 'defer', 'disabled', 'ismap', 'multiple', 'nohref', 'noresize', 'noshade',
+        'nowrap', 'readonly', 'selected'
+    }
+
+    @staticmethod
+    def extract(content: bytes) -> dict:
+        page = SxodimExtractor.parse(content=content)
+        return dict(
+            location=SxodimExtractor.get_location(page=page),
+            description=SxodimExtractor.get_description(page=page),
+            phone=SxodimExtractor.get_phone(page=page),
+            link=SxodimExtractor.get_link(page=page),
+            ticket_url=SxodimExtractor.get_buy_url(page=page)
+        )
+
+    @staticmethod
+    def parse(content: bytes):
+        try:
+            content.decode("utf-8")
+            parser = etree.HTMLParser(encoding="utf-8")
+        except UnicodeDecodeError:
+            parser = etree.HTMLParser()
+        return etree.fromstring(content, parser)
+
+    @staticmethod
+    def rm(value: str) -> str or None:
+        try:
+            return value.replace("&nbsp;", "").replace(" ", "").replace("\n", "").replace("\t", "")
+        except AttributeError:
+            return None
+
+    @staticmethod
+    def get_description(page) -> str:
+        if page is None:
+            return ""
+
+        result = ""
+        for paragraph in SxodimExtractor.DESCRIPTION(page):
+            if len(SxodimExtractor.IMAGES(paragraph)) > 0:
+                continue
+
+            pieces = list()
+            SxodimExtractor.prettify(element=paragraph, level=0, literal=False, pieces=pieces)
+            result += SxodimExtractor.rm("".join(pieces))
+
+        return result
+
+    @staticmethod
+    def get_location(page) -> str or None:
+        if page is None:
+            return None
+
+        location_icon = SxodimExtractor.LOCATION_ICON(page)
+        if len(location_icon) == 0:
+            return None
+
+        location_div = SxodimExtractor.LOCATION_TEXT(location_icon[0])
+        if len(location_div) == 0:
+            return None
+
+        return SxodimExtractor.rm(SxodimExtractor.get_text(element=location_div[0]))
+
+    @staticmethod
+    def get_phone(page) -> str or None:
+        phone_div = SxodimExtractor.PHONE(page) if page is not None else []
+        if len(phone_div) == 0:
+            return None
+
+        return SxodimExtractor.rm(SxodimExtractor.get_text(element=phone_div[0]))
+
+    @staticmethod
+    def get_buy_url(page) -> str or None:
+        buy_ticket_link = SxodimExtractor.BUY_URL(page) if page is not None else []
+        if len(buy_ticket_link) == 0:
+            return None
+        return buy_ticket_link[0].attrib["href"]
+
+    @staticmethod
+    def get_link(page) -> str or None:
+        link_tag = SxodimExtractor.LINK(page) if page is not None else []
+        if len(link_tag) == 0:
+            return None
+        return link_tag[0].attrib["href"]
+
+    @staticmethod
+    def get_text(element, preserve: bool = None) -> str:
+        if preserve is None:
+            preserve = any(
+                ancestor.tag in SxodimExtractor.PRESERVE_WHITESPACE for ancestor in element.iterancestors()
+            ) or element.tag in SxodimExtractor.PRESERVE_WHITESPACE
+
+        pieces = list()
+        if element.text:
+            pieces.append(SxodimExtractor.collapse(value=element.text, preserve=preserve))
+
+        for child in element:
+            if isinstance(child.tag, str) and child.tag not in SxodimExtractor.STRING_CONTAINERS:
+                child_preserve = preserve or child.tag in SxodimExtractor.PRESERVE_WHITESPACE
+                pieces.append(SxodimExtractor.get_text(element=child, preserve=child_preserve))
+            if child.tail:
+                pieces.append(SxodimExtractor.collapse(value=child.tail, preserve=preserve))
+
+        return "".join(pieces)
+
+    @staticmethod
+    def collapse(value: str, preserve: bool) -> str:
+        # BeautifulSoup keeps a string of ascii whitespace, even an empty comment, as a single newline or space
+        if preserve or value.strip(SxodimExtractor.ASCII_SPACES):
+            return value
+        return "\n" if "\n" in value else " "
+
+    @staticmethod
+    def prettify(element, level: int, literal: bool, pieces: list):
+        if element.tag is etree.Comment:
+            comment = SxodimExtractor.collapse(value=element.text or "", preserve=literal)
+            SxodimExtractor.add_string(value=f"<!--{comment}-->", level=level, literal=literal, pieces=pieces)
+            return
+
+        if not isinstance(element.tag, str):
+            return
+
+        name = element.tag
+        opening = f"<{name}{SxodimExtractor.format_attributes(element=element)}"
+        indent = " " * level
+
+        if name in SxodimExtractor.VOID_ELEMENTS and len(element) == 0 and not element.text:
+            pieces.append(f"{opening}/>" if literal else f"{indent}{opening}/>\n")
+            return
+
+        enters_literal = not literal and name in SxodimExtractor.PRESERVE_WHITESPACE
+        if literal:
+            pieces.append(f"{opening}>")
+        else:
+            pieces.append(f"{indent}{opening}>" if enters_literal else f"{indent}{opening}>\n")
+
+        cdata = name in SxodimExtractor.CDATA_CONTAINERS
+        children_literal = literal or enters_literal
+        if element.text:
+            value = element.text if cdata else SxodimExtractor.escape(value=element.text)
+            SxodimExtractor.add_string(value=value, level=level + 1, literal=children_literal, pieces=pieces)
+
+        for child in element:
+            SxodimExtractor.prettify(element=child, level=level + 1, literal=children_literal, pieces=pieces)
+            if child.tail:
+                value = child.tail if cdata else SxodimExtractor.escape(value=child.tail)
+                SxodimExtractor.add_string(value=value, level=level + 1, literal=children_literal, pieces=pieces)
+
+        if literal:
+            pieces.append(f"</{name}>")
+        elif enters_literal:
+            pieces.append(f"</{name}>\n")
+        else:
+            pieces.append(f"{indent}</{name}>\n")
+
+    @staticmethod
+    def add_string(value: str, level: int, literal: bool, pieces: list):
+        if literal:
+            pieces.append(value)
+            return
+
+        value = value.strip()
+        if value:
+            pieces.append(f"{' ' * level}{value}\n")
+
+    @staticmethod
+    def format_attributes(element) -> str:
+        if len(element.attrib) == 0:
+            return ""
+
+        list_attributes = SxodimExtractor.LIST_ATTRIBUTES.get(element.tag, set())
+        attributes = list()
+        for key, value in element.attrib.items():
+            if key in SxodimExtractor.BOOLEAN_ATTRIBUTES and value == key:
+                value = ""
+            elif key in SxodimExtractor.LIST_ATTRIBUTES["*"] or key in list_attributes:
+                value = " ".join(value.split())
+
+            attributes.append((key, SxodimExtractor.quote(value=SxodimExtractor.escape(value=value))))
+
+        return " " + " ".join(f"{key}={value}" for key, value in sorted(attributes))
+
+    @staticmethod
+    def escape(value: str) -> str:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    @staticmethod
+    def quote(value: str) -> str:
+        if '"' not in value:
+            return f'"{value}"'
+        if "'" not in value:
+            return f"'{value}'"
+        return '"' + value.replace('"', "&quot;") + '"'
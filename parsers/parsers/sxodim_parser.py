@@ -1,103 +1,90 @@
 import asyncio
-import datetime
+import hashlib
 import json
-import os
 import traceback
 import uuid
 
-import aiofiles
-import ephem
-from logging import Logger
-
-import aiohttp
-from dateutil import parser
 from bs4 import BeautifulSoup
 
-from helpers import Database, ForeignKeyMapper, Storage
-from models import City, Event, Category, Location
-from models.table_configurations import TableConfiguration
+from helpers import Dates
+from models import City, Event, Category, Location, CrawlDate, CrawlEvent
+from parsers.base_parser import BaseParser
+from parsers.sxodim_extractor import SxodimExtractor
 
 
-class SxodimParser:
+class SxodimParser(BaseParser):
+    SOURCE = 'sxodim'
     DOMAIN = 'https://sxodim.com'
-
-    def __init__(self, config: dict, logger: Logger, db: Database, tables: TableConfiguration,
-                 session: aiohttp.ClientSession):
-        self._db = db
-        self._config = config
-        self._logger = logger
-        self._session = session
-        self._storage = Storage()
-        self._tables = tables
-        self._mapper = ForeignKeyMapper(db=db, tables=tables)
+    # the namespace the ids of existing rows were made in
+    NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'https://sxodim.com')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        extraction = self._config["extraction"]["engine"]
+        self._extract = SxodimExtractor.extract if extraction == "lxml" else self.extract_event_page
+        # pages and events of the cities being crawled, a city drops them once it is done, so a worker that crawls
+        # one city after another does not keep them all
+        self._details = dict()
+        self._events = dict()
+        self._listing = dict(requests=0, saved=0)
 
     @staticmethod
     def parse_date(date: str) -> int or None:
-        try:
-            parsed_date = parser.parse(date)
-            return ephem.julian_date(parsed_date)
-        except Exception:
-            return None
+        return Dates.to_julian(date)
 
-    @staticmethod
-    def rm(value: str) -> str or None:
-        try:
-            return value.replace("&nbsp;", "").replace(" ", "").replace("\n", "").replace("\t", "")
-        except AttributeError:
-            return None
+    # one cleanup for both engines, the lxml one has it since worker processes import it without this module
+    rm = staticmethod(SxodimExtractor.rm)
 
-    async def parse(self):
-        await self._mapper.fill_all()
-
-        async with self._session.get(url=self.DOMAIN) as response:
-            content = await response.read()
-            main_page = BeautifulSoup(content, 'lxml')
+    async def discover(self) -> dict[str, list]:
+        cities = await self.get_cities()
+        results = await asyncio.gather(
+            *[self.get_city_page(slug=city.slug) for city in cities],
+            return_exceptions=True
+        )
 
-        cities = self.parse_cities(main_page=main_page)
-        self._storage.Cities = cities.copy()
+        result = dict()
+        for city, city_page in zip(cities, results):
+            if isinstance(city_page, Exception):
+                self._complete = False
+                self._logger.error(f"Parsing city {city.slug} failed with error {city_page}")
+                continue
+            result[city.slug] = self.get_city_dates(city_page=city_page)
+        return result
 
-        for city in cities:
-            await self.parse_city_events(slug=city.slug)
-
-    async def upload(self):
-        await self._db.insert(
-            table=self._tables.CATEGORIES.NAME,
-            columns=self._tables.CATEGORIES.COLUMNS,
-            data=[
-                [item.__dict__.get(col) for col in self._tables.CATEGORIES.COLUMNS]
-                for item in self._storage.Categories
-            ],
-            on_conflict=self._tables.CATEGORIES.ON_CONFLICT
-        )
-        await self._db.insert(
-            table=self._tables.CITIES.NAME,
-            columns=self._tables.CITIES.COLUMNS,
-            data=[
-                [item.__dict__.get(col) for col in self._tables.CITIES.COLUMNS]
-                for item in self._storage.Cities
-            ],
-            on_conflict=self._tables.CITIES.ON_CONFLICT
-        )
-        await self._db.insert(
-            table=self._tables.EVENTS.NAME,
-            columns=self._tables.EVENTS.COLUMNS,
-            data=[
-                [item.__dict__.get(col) for col in self._tables.EVENTS.COLUMNS]
-                for item in self._storage.Events
-            ],
-            on_conflict=self._tables.EVENTS.ON_CONFLICT
-        )
-        await self._db.insert(
-            table=self._tables.LOCATIONS.NAME,
-            columns=self._tables.LOCATIONS.COLUMNS,
-            data=[
-                [item.__dict__.get(col) for col in self._tables.LOCATIONS.COLUMNS]
-                for item in self._storage.Locations
-            ],
-            on_conflict=self._tables.LOCATIONS.ON_CONFLICT
+    async def crawl(self, city: str, dates: list, checkpoint: bool):
+        crawl_dates, crawl_events = await self.load_checkpoint(slug=city) if checkpoint else (dict(), dict())
+        try:
+            frontier = await self.discover_city_events(
+                slug=city,
+                dates=dates,
+                crawl_dates=crawl_dates,
+                crawl_events=crawl_events,
+                checkpoint=checkpoint
+            )
+            await self.process_city_events(
+                slug=city,
+                frontier=frontier,
+                crawl_events=crawl_events,
+                checkpoint=checkpoint
+            )
+        finally:
+            self._details.pop(city, None)
+            self._events.pop(city, None)
+
+    def report(self):
+        self._logger.info(
+            f"Listing crawl of {self.SOURCE} made {self._listing['requests']} requests, "
+            f"{self._listing['saved']} requests saved"
         )
 
-        self._storage.clear()
+    async def get_cities(self) -> list[City]:
+        content = await self.fetch(url=self.DOMAIN, stage="page")
+        main_page = BeautifulSoup(content, 'lxml')
+
+        cities = self.parse_cities(main_page=main_page)
+        for city in cities:
+            await self.persist(table=self._tables.CITIES, item=city)
+        return cities
 
     def parse_cities(self, main_page: BeautifulSoup) -> list[City]:
         result = list()
@@ -108,7 +95,7 @@ class SxodimParser:
         for city in cities:
             city_id = self._mapper.Cities.get(city["name"])
             if city_id is None:
-                city_id = str(uuid.uuid4())
+                city_id = self.make_id("city", city["name"])
                 self._mapper.Cities[city["name"]] = city_id
 
             city = City(id=city_id, name=city["name"], slug=city["slug"])
@@ -116,61 +103,248 @@ class SxodimParser:
 
         return result
 
-    async def parse_city_events(self, slug: str):
-        city_page = await self.get_city_page(slug=slug)
-        allowed_dates = self.get_city_dates(city_page=city_page)
-
-        page = 1
-        for date in allowed_dates:
-            while True:
-                attempts = 3
-                try:
-                    self._logger.info(f"Parsing events. city: {slug} date: {date} page: {page}")
-                    city_events = await self.get_city_events(city=slug, date=date, page=page)
-                    if len(city_events) == 0:
-                        break
-
-                    for city_event in city_events:
-                        await self.parse_city_event(event=city_event)
-
-                    page += 1
-                except Exception as e:
-                    attempts -= 1
-                    if attempts == 0:
-                        self._logger.error(e, traceback.format_exc())
-                        break
-
-                    await asyncio.sleep(1)
-                    self._logger.error(e)
-
-            await asyncio.sleep(2)
-            await self.upload()
-            page = 1
+    async def process_city_events(self, slug: str, frontier: dict, crawl_events: dict, checkpoint: bool):
+        city_events = [
+            city_event for city_event in frontier.values() if not crawl_events[city_event["slug"]].processed
+        ]
+        if len(city_events) < len(frontier):
+            self._logger.info(f"Resumed {slug}, {len(frontier) - len(city_events)} events were processed before")
+
+        if self._config["incremental"]:
+            pending = len(city_events)
+            hashes = await self._mapper.get_hashes(
+                keys=[self.get_event_key(event=city_event) for city_event in city_events]
+            )
+            city_events = [
+                city_event for city_event in city_events if self.is_event_changed(event=city_event, hashes=hashes)
+            ]
+            self._logger.info(f"Skipped {pending - len(city_events)} unchanged events in {slug}")
+
+        batch = self._config["planner"]["batch"]
+        for i in range(0, len(city_events), batch):
+            await self.parse_city_events_group(
+                slug=slug,
+                city_events=city_events[i:i + batch],
+                crawl_events=crawl_events,
+                checkpoint=checkpoint
+            )
+
+    async def load_checkpoint(self, slug: str) -> tuple[dict, dict]:
+        if not self._resume:
+            return dict(), dict()
+
+        dates, events = await self._db.get_checkpoint(source=self.SOURCE, city=slug)
+        return (
+            {row[2]: CrawlDate(source=row[0], city=row[1], date=row[2], page=row[3], done=row[4]) for row in dates},
+            {
+                row[2]: CrawlEvent(source=row[0], city=row[1], slug=row[2], event=row[3], processed=row[4])
+                for row in events
+            }
+        )
+
+    async def save_date_progress(self, slug: str, date: str, page: int, done: bool, crawl_dates: dict,
+                                 checkpoint: bool):
+        # progress records are never changed in place, the writer stores whichever version was put last
+        crawl_dates[date] = CrawlDate(source=self.SOURCE, city=slug, date=date, page=page, done=int(done))
+        if checkpoint:
+            await self.persist(table=self._tables.CRAWL_DATES, item=crawl_dates[date])
+
+    async def save_event_progress(self, slug: str, event: dict, processed: bool, crawl_events: dict,
+                                  checkpoint: bool):
+        crawl_events[event["slug"]] = CrawlEvent(
+            source=self.SOURCE,
+            city=slug,
+            slug=event["slug"],
+            event=json.dumps(event, ensure_ascii=False),
+            processed=int(processed)
+        )
+        if checkpoint:
+            await self.persist(table=self._tables.CRAWL_EVENTS, item=crawl_events[event["slug"]])
+
+    async def discover_city_events(self, slug: str, dates: list, crawl_dates: dict, crawl_events: dict,
+                                   checkpoint: bool) -> dict:
+        frontier = {event_slug: json.loads(crawl_event.event) for event_slug, crawl_event in crawl_events.items()}
+        listing = dict(requests=0, saved=0)
+
+        await self._scheduler.gather(
+            [
+                self.discover_city_date_events(
+                    slug=slug,
+                    date=date,
+                    frontier=frontier,
+                    listing=listing,
+                    crawl_dates=crawl_dates,
+                    crawl_events=crawl_events,
+                    checkpoint=checkpoint
+                )
+                for date in dates
+            ],
+            limit=self._config["planner"]["dates"]
+        )
+
+        self._listing["requests"] += listing["requests"]
+        self._listing["saved"] += listing["saved"]
+        self._logger.info(
+            f"Discovered {len(frontier)} events in {slug} with {listing['requests']} listing requests, "
+            f"{listing['saved']} listing requests saved"
+        )
+        return frontier
+
+    async def discover_city_date_events(self, slug: str, date: str, frontier: dict, listing: dict,
+                                        crawl_dates: dict, crawl_events: dict, checkpoint: bool):
+        crawl_date = crawl_dates.get(date)
+        if crawl_date is not None and crawl_date.done:
+            return
+
+        page = crawl_date.page + 1 if crawl_date is not None else 1
+        while True:
+            result = await self.get_city_events_page(slug=slug, date=date, page=page)
+            if result is None:
+                self._complete = False
+                return
+
+            listing["requests"] += 1
+            city_events, last_page = result
+            if len(city_events) == 0:
+                await self.save_date_progress(
+                    slug=slug,
+                    date=date,
+                    page=page,
+                    done=True,
+                    crawl_dates=crawl_dates,
+                    checkpoint=checkpoint
+                )
+                return
+
+            for city_event in city_events:
+                seen = frontier.get(city_event["slug"])
+                if seen is None:
+                    frontier[city_event["slug"]] = seen = city_event
+                elif not self.merge_event_dates(seen=seen, event=city_event):
+                    # an event listed on many dates is only stored again when the listing added a date to it
+                    continue
+
+                processed = city_event["slug"] in crawl_events and crawl_events[city_event["slug"]].processed
+                await self.save_event_progress(
+                    slug=slug,
+                    event=seen,
+                    processed=processed,
+                    crawl_events=crawl_events,
+                    checkpoint=checkpoint
+                )
+
+            # dates are listed concurrently, so a page of known events says nothing about the pages after it, every
+            # date is read to its end and only the empty page after the last one is skipped
+            done = last_page is not None and page >= last_page
+            if done:
+                listing["saved"] += 1
+
+            # the page is recorded after its events, so a resumed crawl never skips events it has not stored
+            await self.save_date_progress(
+                slug=slug,
+                date=date,
+                page=page,
+                done=done,
+                crawl_dates=crawl_dates,
+                checkpoint=checkpoint
+            )
+            if done:
+                return
+
+            page += 1
+
+    async def get_city_events_page(self, slug: str, date: str, page: int) -> tuple[list, int | None] | None:
+        try:
+            self._logger.info(f"Parsing events. city: {slug} date: {date} page: {page}")
+            return await self.get_city_events(city=slug, date=date, page=page)
+        except Exception as e:
+            # failed requests were already retried by the governor within its budget
+            self._logger.error(f"Parsing events page failed with error {e}\nTRACEBACK: {traceback.format_exc()}")
+            return None
+
+    def get_event_key(self, event: dict) -> tuple:
+        return self.source_id, event["id"], self._mapper.Cities.get(event["city"]["name"])
+
+    def is_event_changed(self, event: dict, hashes: dict) -> bool:
+        return hashes.get(self.get_event_key(event=event)) != self.get_event_hash(event=event)
+
+    @staticmethod
+    def get_event_hash(event: dict) -> str:
+        if event.get("updated_at"):
+            return str(event["updated_at"])
+
+        content = json.dumps(event, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def merge_event_dates(seen: dict, event: dict) -> bool:
+        dates = {(date.get("date_from"), date.get("date_to")): date for date in seen["event_dates"] + event["event_dates"]}
+        changed = len(dates) != len(seen["event_dates"])
+        # the order does not depend on which listing came first, so neither does the hash of the event
+        seen["event_dates"] = sorted(dates.values(), key=lambda date: (date["date_from"], date.get("date_to") or ""))
+        return changed
+
+    async def parse_city_events_group(self, slug: str, city_events: list, crawl_events: dict, checkpoint: bool):
+        results = await self._scheduler.gather(
+            [self.parse_city_event(event=city_event) for city_event in city_events],
+            limit=self._config["scheduler"]["events"]
+        )
+
+        parsed = list()
+        for city_event, result in zip(city_events, results):
+            if isinstance(result, Exception):
+                self._complete = False
+                self._logger.error(f"Parsing event {city_event.get('slug')} failed with error {result}")
+                continue
+            parsed.append((city_event, result))
+
+        await self.resolve_event_ids(events=[event for _, (_, _, event) in parsed if event.id is None])
+
+        for city_event, (category, location, event) in parsed:
+            await self.persist(table=self._tables.CATEGORIES, item=category)
+            if location is not None:
+                await self.persist(table=self._tables.LOCATIONS, item=location)
+            await self.persist(table=self._tables.EVENTS, item=event)
+            await self.persist(
+                table=self._tables.EVENTS_HASHES,
+                item=(event.source_id, event.src_id, event.city_id, self.get_event_hash(event=city_event))
+            )
+            await self.save_event_progress(
+                slug=slug,
+                event=city_event,
+                processed=True,
+                crawl_events=crawl_events,
+                checkpoint=checkpoint
+            )
 
     async def get_city_page(self, slug: str) -> BeautifulSoup:
         city_url = f"{self.DOMAIN}/{slug}"
-        async with self._session.get(url=city_url) as response:
-            content = await response.read()
-            return BeautifulSoup(content, 'lxml')
+        content = await self.fetch(url=city_url, stage="page", cache=True)
+        return BeautifulSoup(content, 'lxml')
 
     @staticmethod
     def get_city_dates(city_page: BeautifulSoup) -> list:
         calendar_days = city_page.find_all(class_='calendar-day')
         return [day.attrs["data-value"] for day in calendar_days]
 
-    async def get_city_events(self, city: str, date: str, page: int) -> list:
+    async def get_city_events(self, city: str, date: str, page: int) -> tuple[list, int | None]:
         city_events_url = f"{self.DOMAIN}/api/posts/in/{city}?date={date}&page={page}"
-        async with self._session.get(url=city_events_url) as response:
-            content = await response.read()
-            parsed = json.loads(content)
-        return parsed["data"]
+        content = await self.fetch(url=city_events_url, stage="listing", cache=True)
+        parsed = json.loads(content)
+        return parsed["data"], self.get_last_page(listing=parsed)
+
+    @staticmethod
+    def get_last_page(listing: dict) -> int | None:
+        meta = listing.get("meta")
+        last_page = listing.get("last_page") or (meta.get("last_page") if isinstance(meta, dict) else None)
+        return int(last_page) if last_page else None
 
     def parse_city_event_category(self, event: dict):
         category_name = event["category"]["name"]
         category_id = self._mapper.Categories.get(category_name)
 
         if category_id is None:
-            category_id = str(uuid.uuid4())
+            category_id = self.make_id("category", category_name)
             self._mapper.Categories[category_name] = category_id
 
         return Category(
@@ -178,60 +352,119 @@ class SxodimParser:
             name=category_name,
         )
 
-    async def parse_city_event(self, event: dict):
+    async def parse_city_event(self, event: dict) -> tuple[Category, Location | None, Event]:
         url = f"{self.DOMAIN}/{event['city']['slug']}/event/{event['slug']}"
-        page = await self.get_city_event_page(url=url)
+        details = await self.get_event_details(event=event, url=url)
 
         category = self.parse_city_event_category(event=event)
 
-        location = self.get_event_page_location(page=page)
-        location_id = None
-        if location is not None:
-            location_id = location.id
-            self._storage.Locations.add(location)
-
-        source = self._mapper.Sources.value.get("sxodim")
+        location = details["location"]
+        location_id = location.id if location is not None else None
 
         dates = event["event_dates"]
         start_date = self.parse_date(dates[0]["date_from"])
-        end_date = self.parse_date(dates[-1]["date_to"]) if dates[-1].get("date_to") else self.parse_date(dates[-1]["date_from"])
-
-        photo = await self.save_photo(event["image"])
+        # merged spans may overlap, the last one to start is not always the last one to end
+        ends = [self.parse_date(date.get("date_to") or date["date_from"]) for date in dates]
+        end_date = max([date for date in ends if date is not None], default=None)
+
+        city_id = self._mapper.Cities.get(event["city"]["name"])
+        events = self._events.setdefault(event["city"]["slug"], dict())
+        known = events.get(event["id"])
+        if known is not None:
+            known.start = min([date for date in (known.start, start_date) if date is not None], default=None)
+            known.end = max([date for date in (known.end, end_date) if date is not None], default=None)
+            return category, location, known
 
         event = Event(
             id=None,
             src_id=event['id'],
             title=event["name"],
-            photo=photo,
-            description=self.get_event_page_description(page=page),
+            photo=details["photo"],
+            description=details["description"],
             short_description=self.rm(event["description"]),
-            phone=self.get_event_page_phone(page=page),
-            link=self.get_event_page_link(page=page),
+            phone=details["phone"],
+            link=details["link"],
             start=start_date,
             end=end_date,
             location_id=location_id,
             category_id=category.id,
-            city_id=self._mapper.Cities.get(event["city"]["name"]),
+            city_id=city_id,
             url=url,
-            ticket_url=self.get_event_page_buy_url(page=page),
-            source_id=source.id if source is not None else None
+            ticket_url=details["ticket_url"],
+            source_id=self.source_id
         )
 
-        id = self._mapper.Events.get(f"{event.src_id}{event.city_id}{event.start}{event.end}")
-        if id is None:
-            id = str(uuid.uuid4())
+        # the id is looked up for the whole group at once in resolve_event_ids
+        events[event.src_id] = event
 
-        event.id = id
+        return category, location, event
 
-        self._storage.Categories.add(category)
-        self._storage.Events.add(event)
+    async def resolve_event_ids(self, events: list[Event]):
+        ids = await self._mapper.get_event_ids(
+            keys=[(event.source_id, event.src_id, event.city_id, event.start, event.end) for event in events]
+        )
+        for event in events:
+            id = ids.get((event.source_id, event.src_id, event.city_id, event.start, event.end))
+            event.id = id if id is not None else self.make_id("event", self.SOURCE, event.src_id, event.city_id)
+
+    async def get_event_details(self, event: dict, url: str) -> dict:
+        # an event is listed once for every date it runs, its page and photo are fetched only on the first listing
+        details = self._details.setdefault(event["city"]["slug"], dict())
+        task = details.get(event["id"])
+        if task is None:
+            task = asyncio.ensure_future(self.parse_event_details(event=event, url=url))
+            details[event["id"]] = task
+
+        try:
+            return await task
+        except Exception:
+            if details.get(event["id"]) is task:
+                del details[event["id"]]
+            raise
+
+    async def parse_event_details(self, event: dict, url: str) -> dict:
+        content = await self.get_city_event_page(url=url)
 
-    async def get_city_event_page(self, url: str) -> BeautifulSoup:
-        async with self._session.get(url=url) as response:
-            content = await response.read()
-        return BeautifulSoup(content, "lxml")
+        fields = await self.extract(url=url, content=content, function=self._extract)
 
-    def get_event_page_description(self, page: BeautifulSoup):
+        photo = await self._photos.save(url=event["image"])
+
+        return dict(
+            location=self.parse_event_location(name=fields["location"]),
+            description=fields["description"],
+            phone=fields["phone"],
+            link=fields["link"],
+            ticket_url=fields["ticket_url"],
+            photo=photo
+        )
+
+    @staticmethod
+    def extract_event_page(content: bytes) -> dict:
+        page = BeautifulSoup(content, "lxml")
+        return dict(
+            location=SxodimParser.get_event_page_location(page=page),
+            description=SxodimParser.get_event_page_description(page=page),
+            phone=SxodimParser.get_event_page_phone(page=page),
+            link=SxodimParser.get_event_page_link(page=page),
+            ticket_url=SxodimParser.get_event_page_buy_url(page=page)
+        )
+
+    def parse_event_location(self, name: str | None) -> Location | None:
+        if name is None:
+            return None
+
+        location_id = self._mapper.Locations.get(name)
+        if location_id is None:
+            location_id = self.make_id("location", name)
+            self._mapper.Locations[name] = location_id
+
+        return Location(id=location_id, name=name)
+
+    async def get_city_event_page(self, url: str) -> bytes:
+        return await self.fetch(url=url, stage="detail", cache=True)
+
+    @staticmethod
+    def get_event_page_description(page: BeautifulSoup):
         result = ""
 
         paragraphs = page.select(".content_wrapper > p")
@@ -240,32 +473,30 @@ class SxodimParser:
             if len(images) > 0:
                 continue
 
-            content = self.rm(paragraph.prettify())
+            content = SxodimParser.rm(paragraph.prettify())
             result += content
 
         return result
 
-    def get_event_page_location(self, page: BeautifulSoup) -> Location or None:
+    @staticmethod
+    def get_event_page_location(page: BeautifulSoup) -> str or None:
         try:
             location_svg = page.find(class_="svg-icon--location")
             location_div = location_svg.find_next(class_="text")
             if location_div is None:
                 return None
 
-            location = Location(id=str(uuid.uuid4()), name=self.rm(location_div.text))
-            if self._mapper.Locations.get(location.name) is None:
-                self._mapper.Locations[location.name] = location.id
-
-            return location
+            return SxodimParser.rm(location_div.text)
         except:
             return None
 
-    def get_event_page_phone(self, page: BeautifulSoup) -> str or None:
+    @staticmethod
+    def get_event_page_phone(page: BeautifulSoup) -> str or None:
         phone_div = page.select(".group > div.number")
         if len(phone_div) == 0:
             return None
 
-        phone = self.rm(phone_div[0].text)
+        phone = SxodimParser.rm(phone_div[0].text)
         return phone
 
     @staticmethod
@@ -283,32 +514,3 @@ class SxodimParser:
 
         link = link_tag[0]["href"]
         return link
-
-    async def save_photo(self, url: str) -> str | None:
-        attempts = 3
-        try:
-            while True:
-                async with self._session.get(url=url) as response:
-                    if response.status != 200:
-                        raise Exception(f"Incorrect response status {response.status}")
-
-                    file_bytes = await response.read()
-                    filename = url.split("/")[-1]
-                    save_directory = self._config["files"]
-                    os.makedirs(save_directory, exist_ok=True)
-                    file_path = os.path.join(save_directory, filename)
-
-                    if os.path.exists(file_path):
-                        return file_path
-
-                    async with aiofiles.open(file_path, 'wb') as file:
-                        await file.write(file_bytes)
-
-                    return file_path
-
-        except Exception as e:
-            attempts -= 1
-            if attempts == 0:
-                self._logger.error(e, traceback.format_exc())
-                return None
-            self._logger.error(e)
@@ -0,0 +1,44 @@
+import ephem
+import pytest
+from dateutil import parser
+
+from helpers import Dates
+
+
+@pytest.mark.parametrize("date", [
+    "2024-03-01",
+    "2024-03-01 19:00",
+    "2024-03-01 19:00:00",
+    "2024-03-01T19:00:00",
+    "2024-03-01 19:00:00.5",
+    "2024-03-01 19:00:00.123456",
+    "2024-03-01T19:00:00Z",
+    "2024-03-01T19:00:00+06:00",
+    "2024-03-01T19:00:00-0330",
+    "2024-02-29 23:59:59",
+])
+def test_fast_path_agrees_with_dateutil(date):
+    assert Dates.parse_iso(date=date) == parser.parse(date)
+    assert Dates.to_julian(date) == ephem.julian_date(parser.parse(date))
+
+
+@pytest.mark.parametrize("date", ["1 March 2024 19:00", "01.03.2024", "2024-02-30"])
+def test_other_formats_fall_back_to_dateutil(date):
+    assert Dates.parse_iso(date=date) is None
+    try:
+        expected = ephem.julian_date(parser.parse(date))
+    except ValueError:
+        expected = None
+    assert Dates.to_julian(date) == expected
+
+
+@pytest.mark.parametrize("date", ["", "not a date"])
+def test_unparsable_dates_are_none(date):
+    assert Dates.to_julian(date) is None
+
+
+def test_repeated_dates_are_converted_once():
+    Dates.to_julian.cache_clear()
+    dates = ["2024-03-01 19:00:00", "2024-03-02 19:00:00"] * 500
+    assert Dates.to_julian_many(dates) == [Dates.to_julian(date) for date in dates]
+    assert Dates.to_julian.cache_info().misses == 2
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import logging
+import random
+
+import pytest
+
+from helpers import Metrics, Scheduler
+from parsers.sxodim_parser import SxodimParser
+
+PAGE = 5
+# the events listed on every date, an event listed on several dates runs on all of them
+DATES = {"2027-01-01": range(0, 25), "2027-01-02": range(10, 35), "2027-01-03": range(20, 35)}
+
+
+def get_event(i: int, date: str) -> dict:
+    return dict(
+        id=i,
+        slug=f"event-{i}",
+        city=dict(name="Алматы", slug="almaty"),
+        event_dates=[dict(date_from=f"{date} 19:00:00", date_to=f"{date} 21:00:00")]
+    )
+
+
+class Crawler:
+    def __init__(self, seed: int):
+        self._random = random.Random(seed)
+        self.urls = list()
+
+    async def fetch(self, url: str, cache: bool) -> tuple[bytes, bool]:
+        self.urls.append(url)
+        # listings of different dates finish in a different order on every run
+        await asyncio.sleep(self._random.uniform(0, 0.01))
+        query = dict(part.split("=") for part in url.split("?")[1].split("&"))
+        events = [get_event(i=i, date=query["date"]) for i in DATES[query["date"]]]
+        page = int(query["page"])
+        listing = dict(data=events[(page - 1) * PAGE:page * PAGE], last_page=(len(events) + PAGE - 1) // PAGE)
+        return json.dumps(listing).encode(), True
+
+    async def persist(self, table, item):
+        pass
+
+
+def get_parser(crawler: Crawler) -> SxodimParser:
+    return SxodimParser(
+        config=dict(extraction=dict(engine="lxml"), planner=dict(dates=len(DATES))),
+        logger=logging.getLogger(__name__),
+        db=None,
+        tables=None,
+        mapper=None,
+        scheduler=Scheduler(concurrency=1, governor=None),
+        photos=None,
+        metrics=Metrics(),
+        crawler=crawler
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_frontier_merges_every_date_of_an_event(seed):
+    crawler = Crawler(seed=seed)
+    parser = get_parser(crawler=crawler)
+    frontier = asyncio.run(parser.discover_city_events(
+        slug="almaty",
+        dates=list(DATES),
+        crawl_dates=dict(),
+        crawl_events=dict(),
+        checkpoint=False
+    ))
+
+    expected = {
+        f"event-{i}": [date for date, events in DATES.items() if i in events]
+        for i in range(35)
+    }
+    dates = {slug: [date["date_from"][:10] for date in event["event_dates"]] for slug, event in frontier.items()}
+    assert dates == expected
+    # every page up to the last one, the empty page after it is not requested
+    assert len(crawler.urls) == sum((len(events) + PAGE - 1) // PAGE for events in DATES.values())
+
+
+def test_merged_dates_do_not_depend_on_the_order_of_listings():
+    spans = [
+        dict(date_from="2027-01-01 19:00:00", date_to="2027-01-03 21:00:00"),
+        dict(date_from="2027-01-01 19:00:00", date_to="2027-01-01 21:00:00"),
+        dict(date_from="2027-01-02 19:00:00", date_to=None)
+    ]
+    hashes = set()
+    for order in [spans, spans[::-1], spans[1:] + spans[:1]]:
+        seen = dict(event_dates=[order[0]])
+        changed = [SxodimParser.merge_event_dates(seen=seen, event=dict(event_dates=[span])) for span in order[1:]]
+        assert changed == [True, True]
+        assert not SxodimParser.merge_event_dates(seen=seen, event=dict(event_dates=[order[0]]))
+        hashes.add(SxodimParser.get_event_hash(event=seen))
+    assert len(hashes) == 1
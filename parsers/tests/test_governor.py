@@ -0,0 +1,145 @@
+import asyncio
+import logging
+
+import pytest
+
+from helpers import Governor, ResponseError
+
+URL = "https://sxodim.com/almaty"
+
+
+def get_governor(**kwargs) -> Governor:
+    config = dict(
+        rate=10,
+        min_rate=1,
+        max_rate=100,
+        burst=10,
+        concurrency=4,
+        min_concurrency=1,
+        max_concurrency=32,
+        latency=3,
+        increase=4,
+        decrease=0.5,
+        attempts=4,
+        budget=0.1,
+        reserve=10,
+        backoff=0
+    )
+    config.update(kwargs)
+    return Governor(logger=logging.getLogger(__name__), **config)
+
+
+def test_limits_grow_by_one_per_success_until_the_host_pushes_back():
+    async def run():
+        governor = get_governor()
+        limiter = governor.host(URL)
+        for _ in range(3):
+            governor.record(limiter=limiter, elapsed=0.1, error=None)
+        return limiter.limit, limiter.rate
+
+    assert asyncio.run(run()) == (7, 22)
+
+
+def test_congestion_cuts_the_limits_once_per_round_trip_and_they_grow_back_additively():
+    async def run():
+        governor = get_governor(concurrency=8)
+        limiter = governor.host(URL)
+        # every request in flight sees the same overload, only the first one cuts the limits
+        for _ in range(3):
+            governor.record(limiter=limiter, elapsed=1, error=ResponseError(status=503))
+        cut = limiter.limit, limiter.rate
+
+        for _ in range(4):
+            governor.record(limiter=limiter, elapsed=0.1, error=None)
+        return cut, limiter.limit, limiter.Stats["throttled"]
+
+    (limit, rate), grown, throttled = asyncio.run(run())
+    assert (limit, rate) == (4, 5)
+    # a window of limit successes adds one slot
+    assert grown == pytest.approx(5, abs=0.1)
+    assert throttled == 3
+
+
+def test_limits_stay_within_their_bounds():
+    async def run():
+        governor = get_governor(concurrency=2, max_concurrency=3, rate=2, max_rate=5)
+        limiter = governor.host(URL)
+        for _ in range(5):
+            governor.record(limiter=limiter, elapsed=0.1, error=None)
+        grown = limiter.limit, limiter.rate
+
+        for _ in range(5):
+            limiter.last_decrease = 0
+            governor.record(limiter=limiter, elapsed=10, error=None)
+        return grown, (limiter.limit, limiter.rate), limiter.Stats["slow"]
+
+    assert asyncio.run(run()) == ((3, 5), (1, 1), 5)
+
+
+def test_retry_after_pauses_the_host_and_sets_the_delay():
+    async def run():
+        governor = get_governor()
+        limiter = governor.host(URL)
+        error = ResponseError(status=429, retry_after="2")
+        governor.record(limiter=limiter, elapsed=0.1, error=error)
+        paused = limiter.paused_until - asyncio.get_running_loop().time()
+        return paused, governor.get_retry_delay(error=error, attempt=1)
+
+    paused, delay = asyncio.run(run())
+    assert paused == pytest.approx(2, abs=0.1)
+    assert delay == 2
+
+
+class Requests:
+    def __init__(self, errors: list):
+        self._errors = errors
+        self.count = 0
+
+    async def __call__(self):
+        self.count += 1
+        if self._errors:
+            raise self._errors.pop(0)
+        return b"content"
+
+
+def test_retryable_errors_are_retried_until_a_response():
+    governor = get_governor()
+    request = Requests(errors=[ResponseError(status=503), ResponseError(status=429)])
+    assert asyncio.run(governor.call(url=URL, request=request)) == b"content"
+    assert request.count == 3
+    assert governor.metrics()["sxodim.com"]["retries"] == 2
+
+
+def test_other_errors_are_not_retried():
+    governor = get_governor()
+    request = Requests(errors=[ResponseError(status=404)])
+    with pytest.raises(ResponseError):
+        asyncio.run(governor.call(url=URL, request=request))
+    assert request.count == 1
+
+
+def test_retries_stop_after_the_last_attempt():
+    governor = get_governor(attempts=3)
+    request = Requests(errors=[ResponseError(status=503)] * 5)
+    with pytest.raises(ResponseError):
+        asyncio.run(governor.call(url=URL, request=request))
+    assert request.count == 3
+
+
+def test_retries_are_paid_from_a_budget_refilled_by_requests():
+    governor = get_governor(attempts=10, reserve=2, budget=0.5)
+
+    async def run():
+        counts = list()
+        for _ in range(3):
+            request = Requests(errors=[ResponseError(status=503)] * 10)
+            with pytest.raises(ResponseError):
+                await governor.call(url=URL, request=request)
+            counts.append(request.count)
+        return counts
+
+    # the reserve pays for two retries, afterwards every request only earns half of one
+    assert asyncio.run(run()) == [3, 1, 2]
+    metrics = governor.metrics()["sxodim.com"]
+    assert metrics["retries"] == 3
+    assert metrics["budget_exhausted"] == 3
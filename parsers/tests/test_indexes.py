@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import os
+
+from helpers import HttpCache, PhotoStorage
+
+
+def test_http_cache_keeps_the_pages_of_every_worker(tmp_path):
+    async def run():
+        # two workers load the same empty directory and each store their own pages
+        first = HttpCache(directory=str(tmp_path), max_size=1000)
+        second = HttpCache(directory=str(tmp_path), max_size=1000)
+        first.load()
+        second.load()
+        await first.store(url="/a", content=b"a" * 100, content_type="text/html", etag='"a"', last_modified=None)
+        await second.store(url="/b", content=b"b" * 100, content_type="text/html", etag='"b"', last_modified=None)
+        await second.store(url="/c", content=b"c" * 100, content_type="text/html", etag='"c"', last_modified=None)
+        first.save()
+        second.save()
+
+        cache = HttpCache(directory=str(tmp_path), max_size=1000)
+        cache.load()
+        assert cache.size == 300
+        assert [await cache.read(url=url) for url in ("/a", "/b", "/c")] == [b"a" * 100, b"b" * 100, b"c" * 100]
+
+    asyncio.run(run())
+
+
+def test_http_cache_evicts_across_workers_and_drops_evicted_entries(tmp_path):
+    async def run():
+        first = HttpCache(directory=str(tmp_path), max_size=250)
+        second = HttpCache(directory=str(tmp_path), max_size=250)
+        first.load()
+        second.load()
+        await first.store(url="/a", content=b"a" * 100, content_type=None, etag='"a"', last_modified=None)
+        await first.store(url="/b", content=b"b" * 100, content_type=None, etag='"b"', last_modified=None)
+        await second.store(url="/c", content=b"c" * 100, content_type=None, etag='"c"', last_modified=None)
+        first.save()
+        # together they hold more than the limit, the least recently used page goes
+        second.save()
+        # the first worker still has the evicted page in memory
+        first.save()
+
+        cache = HttpCache(directory=str(tmp_path), max_size=250)
+        cache.load()
+        assert cache.size == 200
+        assert sorted(cache.read_index()) == ["/b", "/c"]
+        # no file is left that the index does not count
+        assert sorted(name for name in os.listdir(tmp_path) if not name.startswith(HttpCache.INDEX)) == sorted(
+            os.path.basename(cache.get_path(url=url)) for url in ("/b", "/c")
+        )
+
+    asyncio.run(run())
+
+
+def test_photo_index_keeps_the_photos_of_every_worker(tmp_path):
+    async def fetch(url: str) -> bytes:
+        return url.encode()
+
+    async def run():
+        workers = [
+            PhotoStorage(directory=str(tmp_path), fetch=fetch, logger=logging.getLogger(__name__), concurrency=1)
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.load()
+        paths = [await worker.save(url=f"http://photos/{i}.jpg") for i, worker in enumerate(workers)]
+        for worker in workers:
+            worker.save_index()
+
+        photos = PhotoStorage(directory=str(tmp_path), fetch=fetch, logger=logging.getLogger(__name__), concurrency=1)
+        photos.load()
+        assert [photos.get_cached(url=f"http://photos/{i}.jpg") for i in range(2)] == paths
+        assert photos.Stats["cached"] == 2
+
+    asyncio.run(run())
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+
+import pytest
+
+from helpers import Database, ResponseError
+from models import CrawlJob
+from models.table_configurations import TableConfiguration
+from parsers import BaseParser, Crawler
+
+CONFIG = os.path.join(os.path.dirname(__file__), "..", "config.json")
+JOBS = [("sxodim", "almaty", json.dumps(["2027-01-01"])), ("sxodim", "astana", json.dumps(["2027-01-01"]))]
+
+
+async def get_database(path: str) -> Database:
+    db = Database(config=dict(connection=dict(sqlite=path, timeout=5)), tables=TableConfiguration())
+    await db.migrate()
+    await db.enqueue_jobs(jobs=JOBS, reset=True)
+    return db
+
+
+def get_jobs(path: str) -> list:
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT city, status, worker, attempts FROM crawl_jobs ORDER BY city").fetchall()
+
+
+def test_every_job_is_leased_to_one_worker(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        db = await get_database(path=path)
+        return [await db.claim_job(worker=worker, lease=60, attempts=3) for worker in ("first", "second", "third")]
+
+    first, second, third = asyncio.run(run())
+    assert (first[1], first[4]) == ("almaty", "first")
+    assert (second[1], second[4]) == ("astana", "second")
+    assert third is None
+
+
+def test_an_expired_lease_is_reclaimed_and_only_its_holder_extends_it(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        db = await get_database(path=path)
+        await db.enqueue_jobs(jobs=JOBS[:1], reset=True)
+        # the first worker died, its lease ran out
+        await db.claim_job(worker="first", lease=-1, attempts=3)
+        job = await db.claim_job(worker="second", lease=60, attempts=3)
+        extended = [
+            await db.extend_lease(source="sxodim", city="almaty", worker=worker, lease=60)
+            for worker in ("first", "second")
+        ]
+        return job, extended
+
+    job, extended = asyncio.run(run())
+    assert (job[1], job[4], job[6]) == ("almaty", "second", 2)
+    assert extended == [False, True]
+
+
+def test_a_job_fails_once_it_used_up_its_attempts(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        db = await get_database(path=path)
+        await db.claim_job(worker="first", lease=-1, attempts=1)
+        await db.claim_job(worker="second", lease=60, attempts=1)
+        # released by its holder, a job goes back to the queue until its attempts are used up
+        await db.release_job(source="sxodim", city="astana", worker="first", attempts=2)
+        await db.release_job(source="sxodim", city="astana", worker="second", attempts=2)
+        job = await db.claim_job(worker="second", lease=60, attempts=2)
+        await db.release_job(source="sxodim", city="astana", worker="second", attempts=2)
+        return job, await db.count_jobs()
+
+    job, jobs = asyncio.run(run())
+    assert (job[1], job[6]) == ("astana", 2)
+    assert get_jobs(path=path) == [("almaty", "failed", None, 1), ("astana", "failed", None, 2)]
+    assert jobs == dict(failed=2)
+
+
+def test_only_the_lease_holder_marks_a_job_done(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    tables = TableConfiguration()
+
+    async def run():
+        db = await get_database(path=path)
+        await db.enqueue_jobs(jobs=JOBS[:1], reset=True)
+        await db.claim_job(worker="first", lease=-1, attempts=3)
+        await db.claim_job(worker="second", lease=60, attempts=3)
+
+        await db.connect()
+        result = list()
+        # the first worker finishes after its lease was taken over, then the second one finishes
+        for worker in ("first", "second"):
+            done = CrawlJob(
+                source="sxodim",
+                city="almaty",
+                dates=JOBS[0][2],
+                status="done",
+                worker=worker,
+                lease_until=None,
+                attempts=2
+            )
+            await db.write(batches=[(tables.CRAWL_JOBS, [tables.CRAWL_JOBS.ROW(done)])])
+            result.append(get_jobs(path=path)[0])
+        await db.disconnect()
+        return result
+
+    assert asyncio.run(run()) == [("almaty", "leased", "second", 2), ("almaty", "done", "second", 2)]
+
+
+def test_enqueueing_again_keeps_the_jobs_that_are_done(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        db = await get_database(path=path)
+        with sqlite3.connect(path) as connection:
+            connection.execute("UPDATE crawl_jobs SET status = 'done' WHERE city = 'almaty'")
+        dates = json.dumps(["2027-01-02"])
+        await db.enqueue_jobs(jobs=[(source, city, dates) for source, city, _ in JOBS], reset=False)
+
+    asyncio.run(run())
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT city, status, dates FROM crawl_jobs ORDER BY city").fetchall() == [
+            ("almaty", "done", JOBS[0][2]),
+            ("astana", "pending", json.dumps(["2027-01-02"]))
+        ]
+
+
+class SlowParser(BaseParser):
+    SOURCE = "sxodim"
+
+    async def discover(self) -> dict[str, list]:
+        return dict()
+
+    async def crawl(self, city: str, dates: list, checkpoint: bool):
+        self.crawled = False
+        await asyncio.sleep(10)
+        self.crawled = True
+
+
+def get_crawler(path: str, db: Database, session=None, **jobs) -> Crawler:
+    with open(CONFIG, 'r', encoding='utf-8') as file:
+        config = json.load(file)
+    config["connection"]["sqlite"] = path
+    config["http_cache"]["enabled"] = False
+    config["jobs"].update(jobs)
+    return Crawler(
+        config=config,
+        logger=logging.getLogger(__name__),
+        db=db,
+        tables=TableConfiguration(),
+        session=session,
+        parsers=[SlowParser]
+    )
+
+
+def test_a_worker_stops_a_job_whose_lease_it_lost(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        db = await get_database(path=path)
+        crawler = get_crawler(path=path, db=db, lease=0.06)
+        row = await db.claim_job(worker="first", lease=60, attempts=3)
+        job = CrawlJob(*row)
+        # another worker took the job over, the next heartbeat of the first one finds out
+        with sqlite3.connect(path) as connection:
+            connection.execute("UPDATE crawl_jobs SET worker = 'second' WHERE city = ?", [job.city])
+        await asyncio.wait_for(crawler.parse_job(worker="first", job=job), timeout=5)
+
+    asyncio.run(run())
+    assert get_jobs(path=path)[0] == ("almaty", "leased", "second", 1)
+
+
+class Response:
+    status = 304
+    headers = dict()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class Session:
+    def get(self, url: str, headers: dict | None) -> Response:
+        return Response()
+
+
+def test_a_not_modified_response_without_the_http_cache_is_an_error(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        crawler = get_crawler(path=path, db=None, session=Session())
+        await crawler.request(url="https://sxodim.com/almaty", cache=True)
+
+    with pytest.raises(ResponseError):
+        asyncio.run(run())
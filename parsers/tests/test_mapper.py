@@ -0,0 +1,71 @@
+import asyncio
+
+from helpers import ForeignKeyMapper
+from models.table_configurations import TableConfiguration
+
+
+class Database:
+    def __init__(self, hashes: dict):
+        self._hashes = hashes
+        self.lookups = list()
+
+    async def get_events_hashes(self, keys: list[tuple] = None) -> dict:
+        self.lookups.append(keys)
+        return {key: self._hashes[key] for key in keys if key in self._hashes}
+
+    async def get_events_ids(self, keys: list[tuple]) -> dict:
+        self.lookups.append(keys)
+        return {(*key, 1.5, 2.5): f"event-{key[1]}" for key in keys if key[1] % 2 == 0}
+
+
+def get_mapper(db: Database, cache_size: int = 100, batch: int = 400) -> ForeignKeyMapper:
+    return ForeignKeyMapper(db=db, tables=TableConfiguration(), lazy=True, cache_size=cache_size, batch=batch)
+
+
+def test_known_and_unknown_keys_are_looked_up_once():
+    db = Database(hashes={(1, 1, "city"): "first"})
+    mapper = get_mapper(db=db)
+    keys = [(1, 1, "city"), (1, 2, "city")]
+
+    async def run():
+        return [await mapper.get_hashes(keys=keys) for _ in range(2)]
+
+    first, second = asyncio.run(run())
+    assert first == second == {(1, 1, "city"): "first", (1, 2, "city"): None}
+    assert db.lookups == [keys]
+
+
+def test_lookups_are_split_into_batches_of_unique_keys():
+    db = Database(hashes=dict())
+    mapper = get_mapper(db=db, batch=2)
+    keys = [(1, i, "city") for i in range(5)]
+    asyncio.run(mapper.get_hashes(keys=keys + keys))
+    assert db.lookups == [keys[0:2], keys[2:4], keys[4:5]]
+
+
+def test_the_least_recently_used_keys_are_dropped_first():
+    db = Database(hashes=dict())
+    mapper = get_mapper(db=db, cache_size=2)
+
+    async def run():
+        await mapper.get_hashes(keys=[(1, 1, "city"), (1, 2, "city")])
+        # the first key is used again, so the second one goes when the third comes in
+        await mapper.get_hashes(keys=[(1, 1, "city")])
+        await mapper.get_hashes(keys=[(1, 3, "city")])
+        db.lookups.clear()
+        await mapper.get_hashes(keys=[(1, 1, "city"), (1, 2, "city"), (1, 3, "city")])
+
+    asyncio.run(run())
+    assert db.lookups == [[(1, 2, "city")]]
+    assert len(mapper.Hashes) == 2
+
+
+def test_event_ids_are_looked_up_by_their_source_key_and_matched_with_their_dates():
+    db = Database(hashes=dict())
+    mapper = get_mapper(db=db)
+    keys = [(1, 2, "city", 1.5, 2.5), (1, 2, "city", 1.5, 3.5), (1, 3, "city", 1.5, 2.5)]
+
+    ids = asyncio.run(mapper.get_event_ids(keys=keys))
+    assert ids == {keys[0]: "event-2", keys[1]: None, keys[2]: None}
+    # both dates of the same event share one lookup
+    assert db.lookups == [[(1, 2, "city"), (1, 3, "city")]]
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import sqlite3
+
+import pytest
+
+from helpers import Database, Writer
+from models import Category, City, CrawlDate, Event
+from models.table_configurations import TableConfiguration
+
+
+def get_event(i: int, city_id: str | None) -> Event:
+    return Event(
+        id=f"event-{i}",
+        src_id=i,
+        title=f"Событие {i}",
+        photo=None,
+        short_description=None,
+        description=None,
+        phone=None,
+        link=None,
+        start=2461407.5,
+        end=2461408.5,
+        location_id=None,
+        source_id=1,
+        city_id=city_id,
+        url=None,
+        ticket_url=None,
+        category_id="category"
+    )
+
+
+class GatedDatabase(Database):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gate = asyncio.Event()
+
+    async def write(self, batches: list):
+        await self.gate.wait()
+        await super().write(batches=batches)
+
+
+async def get_writer(path: str, batch_rows: int = 1000, interval: float = 60, queue_size: int = 10,
+                     db: type[Database] = Database) -> tuple[Writer, Database, TableConfiguration]:
+    tables = TableConfiguration()
+    db = db(config=dict(connection=dict(sqlite=path, timeout=5)), tables=tables)
+    await db.migrate()
+    writer = Writer(
+        db=db,
+        tables=tables,
+        logger=logging.getLogger(__name__),
+        queue_size=queue_size,
+        batch_rows=batch_rows,
+        batch_bytes=10 ** 6,
+        interval=interval
+    )
+    await writer.start()
+    return writer, db, tables
+
+
+def count(path: str, table: str) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_a_bad_row_does_not_roll_back_the_rest_of_the_batch(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        writer, _, tables = await get_writer(path=path)
+        await writer.put(table=tables.CATEGORIES, item=Category(id="category", name="Концерты"))
+        await writer.put(table=tables.CITIES, item=City(id="city", name="Алматы", slug="almaty"))
+        for i in range(3):
+            await writer.put(table=tables.EVENTS, item=get_event(i=i, city_id="city"))
+            await writer.put(table=tables.EVENTS_HASHES, item=(1, i, "city", f"hash-{i}"))
+        # the city of this event was never mapped, its hash breaks the not null constraint
+        await writer.put(table=tables.EVENTS, item=get_event(i=3, city_id=None))
+        await writer.put(table=tables.EVENTS_HASHES, item=(1, 3, None, "hash-3"))
+        await writer.put(
+            table=tables.CRAWL_DATES,
+            item=CrawlDate(source="sxodim", city="almaty", date="2027-01-01", page=1, done=1)
+        )
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.Stats == dict(flushes=1, rows=10, failed=1)
+    assert count(path=path, table="events") == 4
+    assert count(path=path, table="events_hashes") == 3
+    assert count(path=path, table="crawl_dates") == 1
+
+
+def test_rows_are_flushed_in_batches_of_the_row_limit(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        writer, _, tables = await get_writer(path=path, batch_rows=3)
+        for i in range(7):
+            await writer.put(table=tables.CATEGORIES, item=Category(id=f"category-{i}", name=f"Категория {i}"))
+        await writer.sync()
+        # the last row waits for more rows or the interval, sync commits it
+        flushes = writer.Stats["flushes"]
+        await writer.close()
+        return writer, flushes
+
+    writer, flushes = asyncio.run(run())
+    assert flushes == 3
+    assert writer.Stats == dict(flushes=3, rows=7, failed=0)
+    assert count(path=path, table="categories") == 7
+
+
+def test_buffered_rows_are_flushed_after_the_interval(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        writer, _, tables = await get_writer(path=path, interval=0.05)
+        await writer.put(table=tables.CATEGORIES, item=Category(id="category", name="Концерты"))
+        await asyncio.sleep(0.01)
+        before = count(path=path, table="categories")
+        await asyncio.sleep(0.2)
+        after = count(path=path, table="categories")
+        await writer.close()
+        return before, after
+
+    assert asyncio.run(run()) == (0, 1)
+
+
+def test_a_row_put_again_is_written_once_with_its_latest_values(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        writer, _, tables = await get_writer(path=path)
+        for title in ("first", "second"):
+            event = get_event(i=1, city_id="city")
+            event.title = title
+            await writer.put(table=tables.EVENTS, item=event)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.Stats == dict(flushes=1, rows=1, failed=0)
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT title FROM events").fetchall() == [("second",)]
+
+
+def test_a_full_queue_holds_the_crawl_back(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+
+    async def run():
+        writer, db, tables = await get_writer(path=path, batch_rows=1, queue_size=1, db=GatedDatabase)
+        # the first row is being written until the gate opens, the second one fills the queue
+        for name in ("first", "second"):
+            await writer.put(table=tables.CATEGORIES, item=Category(id=name, name=name))
+            await asyncio.sleep(0.01)
+        put = asyncio.ensure_future(writer.put(table=tables.CATEGORIES, item=Category(id="third", name="third")))
+        await asyncio.sleep(0.01)
+        waited = not put.done()
+
+        db.gate.set()
+        await put
+        await writer.close()
+        return waited
+
+    assert asyncio.run(run())
+    assert count(path=path, table="categories") == 3
+
+
+def test_putting_into_a_closed_writer_fails(tmp_path):
+    async def run():
+        writer, _, tables = await get_writer(path=str(tmp_path / "db.sqlite"))
+        await writer.close()
+        await writer.put(table=tables.CATEGORIES, item=Category(id="category", name="Концерты"))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())